@@ -1,32 +1,56 @@
 # app.py
 from flask import Flask, render_template
 from core.config import Config
-from core.extensions import db, login_manager
+from core.extensions import db, login_manager, mail
 from datetime import datetime
 from core.models import User, Department, Program, Teacher, Course, StudentGroup
+from core.schema import upgrade_schema
+from core.database import configure_engines
 from flask_login import current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
     app.config.from_object(Config)
+    if config:
+        app.config.update(config)
     
     # Initialize extensions
+    import core.cache  # registers the DataVersion change hooks
+    import patterns.teacher_load  # keeps TeacherLoad in step with Schedule
+    import core.identity  # cached Flask-Login user loader
+    configure_engines(app)
     db.init_app(app)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
+    mail.init_app(app)
     
     # Register blueprints
     from routes.auth import auth_bp
     from routes.admin import admin_bp
     from routes.teacher import teacher_bp
     from routes.student import student_bp
+    from routes.api import api_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(teacher_bp, url_prefix='/teacher')
     app.register_blueprint(student_bp, url_prefix='/student')
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
+
+    from patterns.outbox import init_outbox
+    init_outbox(app)
+
+    from core.query_profile import init_query_profile
+    init_query_profile(app)
+
+    from core.metrics import init_metrics
+    init_metrics(app)
+
+    # Register CLI commands
+    from core.commands import register_commands
+    register_commands(app)
     
     # Initialize database with default data
     with app.app_context():
@@ -35,7 +59,8 @@ def create_app():
     # Add cache control headers
     @app.after_request
     def add_header(response):
-        if current_user.is_authenticated:
+        # Responses carrying a validator manage their own caching
+        if current_user.is_authenticated and not response.headers.get('ETag'):
             response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'
             response.headers['Pragma'] = 'no-cache'
             response.headers['Expires'] = '-1'
@@ -52,7 +77,8 @@ def create_app():
     return app
 
 def initialize_database():
-    db.create_all()
+    db.create_all(bind_key=None)  # the primary only: a replica gets its tables through replication
+    upgrade_schema()
     
     # Create default admin user
     admin = User.query.filter_by(username="admin").first()
@@ -0,0 +1,207 @@
+# cache.py
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime
+from itertools import chain
+
+from flask import Response, current_app, request
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from core.extensions import db
+from core.metrics import record_cache
+from core.models import DataVersion
+
+# Tables whose changes bump their DataVersion counter. 'user' is left out: logins (rehash,
+# calendar token) change user rows, and no cached page is rendered from them
+VERSIONED_TABLES = ('department', 'program', 'teacher', 'student_group', 'room', 'course', 'schedule')
+
+logger = logging.getLogger(__name__)
+_bump_listeners = []
+
+def on_versions_bumped(listener):
+    """Register `listener(session, versions)`, called after every commit of a session.
+
+    `versions` maps each scope bumped by that commit to its new counter
+    (empty when nothing was bumped), or is None when the bump failed.
+    """
+    _bump_listeners.append(listener)
+    return listener
+
+def bump_versions(session, scopes):
+    """Bump the counters of `scopes` once the session commits (nothing happens on rollback)."""
+    session.info.setdefault('version_scopes', set()).update(scopes)
+
+def _increment(scopes):
+    """Increment the counters in a short transaction of their own on the primary; return {scope: version}.
+
+    Running after the data commit keeps the DataVersion row locks out of
+    the writing transactions, so concurrent writes are not serialized on them.
+    """
+    table = DataVersion.__table__
+    now = datetime.utcnow()
+    with db.engine.begin() as connection:
+        for scope in sorted(scopes):
+            result = connection.execute(
+                table.update().where(table.c.scope == scope).values(version=table.c.version + 1, updated_at=now)
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(scope=scope, version=1, updated_at=now))
+        return dict(connection.execute(select(table.c.scope, table.c.version).where(table.c.scope.in_(scopes))).all())
+
+def current_versions(*scopes):
+    """Return the counters of `scopes` as a tuple (one query)."""
+    rows = dict(db.session.query(DataVersion.scope, DataVersion.version).filter(DataVersion.scope.in_(scopes)))
+    return tuple(rows.get(scope, 0) for scope in scopes)
+
+def data_state(*scopes):
+    """Return (counters of `scopes` as a tuple, time of the latest bump or None) in one query."""
+    rows = {
+        scope: (version, updated_at)
+        for scope, version, updated_at in db.session.query(
+            DataVersion.scope, DataVersion.version, DataVersion.updated_at
+        ).filter(DataVersion.scope.in_(scopes))
+    }
+    versions = tuple(rows.get(scope, (0, None))[0] for scope in scopes)
+    times = [updated_at for _version, updated_at in rows.values() if updated_at is not None]
+    return versions, max(times) if times else None
+
+@event.listens_for(Session, 'after_flush')
+def _bump_changed_tables(session, flush_context):
+    scopes = {
+        obj.__tablename__
+        for obj in chain(session.new, session.dirty, session.deleted)
+        if getattr(obj, '__tablename__', None) in VERSIONED_TABLES
+        and (obj not in session.dirty or session.is_modified(obj))
+    }
+    if scopes:
+        bump_versions(session, scopes)
+
+@event.listens_for(Session, 'after_commit')
+def _bump_committed_tables(session):
+    scopes = session.info.pop('version_scopes', None)
+    versions = {}
+    if scopes:
+        try:
+            versions = _increment(scopes)
+        except Exception:
+            # The data is committed; caches keyed on these scopes stay stale until their next bump
+            logger.exception('Could not bump data versions %s', sorted(scopes))
+            versions = None
+    for listener in _bump_listeners:
+        listener(session, versions)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_tables(session):
+    session.info.pop('version_scopes', None)
+
+def cache_key(*parts):
+    """Stable hex digest for a tuple of key parts."""
+    return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+
+def build_id():
+    """Version of the deployed code: BUILD_ID, else the newest template modification time (read once per app).
+
+    Part of the ETags of rendered pages, so that a deploy changing their
+    markup is not answered with 304 from the browsers' old copies.
+    """
+    app = current_app._get_current_object()
+    if 'build_id' not in app.extensions:
+        build = app.config.get('BUILD_ID')
+        if not build:
+            folder = os.path.join(app.root_path, app.template_folder)
+            build = max((os.path.getmtime(os.path.join(root, name))
+                         for root, _dirs, names in os.walk(folder) for name in names), default=0)
+        app.extensions['build_id'] = str(build)
+    return app.extensions['build_id']
+
+class FileCache:
+    """On-disk byte store with least-recently-used eviction above `max_bytes`.
+
+    Entries are files named by their key; reading an entry refreshes its
+    mtime, which is the recency used for eviction. Writes go through a
+    temporary file and os.replace, so concurrent workers never see a
+    partial entry.
+    """
+    def __init__(self, directory, max_bytes, name='file'):
+        self.directory = directory
+        self.name = name
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as handle:
+                data = handle.read()
+            os.utime(path)
+        except FileNotFoundError:
+            record_cache(self.name, False)
+            return None
+        record_cache(self.name, True)
+        return data
+
+    def set(self, key, data):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as handle:
+            handle.write(data)
+        os.replace(temp_path, path)
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _mtime, size, _path in entries)
+            for _mtime, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+_file_caches = {}
+
+def file_cache(prefix):
+    """FileCache configured by `<prefix>_CACHE_DIR` (relative to the instance folder) and `<prefix>_CACHE_MAX_BYTES`."""
+    directory = current_app.config[f'{prefix}_CACHE_DIR']
+    if not os.path.isabs(directory):
+        directory = os.path.join(current_app.instance_path, directory)
+    if directory not in _file_caches:
+        _file_caches[directory] = FileCache(directory, current_app.config[f'{prefix}_CACHE_MAX_BYTES'],
+                                              prefix.lower())
+    return _file_caches[directory]
+
+def cached_artifact_response(cache, key, mimetype, build, headers=None):
+    """Serve bytes stored under `key`, building them with `build()` on a miss.
+
+    The key doubles as the ETag: a matching If-None-Match is answered with
+    304 before the store is read.
+    """
+    etag = key[:40]
+    headers = dict(headers or {})
+    headers.setdefault('Cache-Control', 'private, no-cache')
+    if etag in request.if_none_match:
+        response = Response(status=304, headers=headers)
+        response.set_etag(etag)
+        return response
+
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data)
+    response = Response(data, mimetype=mimetype, headers=headers)
+    response.set_etag(etag)
+    return response
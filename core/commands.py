@@ -0,0 +1,328 @@
+# commands.py
+import json
+
+import click
+from flask import current_app
+
+def register_commands(app):
+    """Register the `flask ...` maintenance commands."""
+
+    @app.cli.command('generate-timetable')
+    @click.option('--program', 'program_id', type=int, help='Program id.')
+    @click.option('--year', type=int, help='Academic year (1, 2, 3).')
+    @click.option('--all', 'faculty', is_flag=True, help='Build every program at its academic year together.')
+    @click.option('--time-budget', type=float, default=None, help='Local search time in seconds.')
+    @click.option('--seed', type=int, default=None, help='Random seed for reproducible runs.')
+    @click.option('--workers', type=int, default=None, help='Worker processes (default: TIMETABLE_WORKERS).')
+    @click.option('--rounds', type=int, default=1, help='Parallel rounds; later rounds restart from the best result.')
+    @click.option('--save/--dry-run', default=False, help='Replace the stored timetable with the result.')
+    def generate_timetable(program_id, year, faculty, time_budget, seed, workers, rounds, save):
+        """Generate a conflict-free timetable and report its scores."""
+        from patterns.timetable import load_problem, load_faculty_problem, solve, solve_parallel, save_solution
+
+        weeks = current_app.config['SEMESTER_WEEKS']
+        if faculty:
+            problem = load_faculty_problem(weeks=weeks)
+        elif program_id and year:
+            problem = load_problem(program_id, year, weeks=weeks)
+        else:
+            raise click.UsageError('Give --program and --year, or --all.')
+
+        budget = time_budget if time_budget is not None else current_app.config['TIMETABLE_TIME_BUDGET']
+        workers = workers if workers is not None else current_app.config['TIMETABLE_WORKERS']
+        if workers == 1:
+            result = solve(problem, time_budget=budget, seed=seed)
+        else:
+            result = solve_parallel(problem, time_budget=budget, workers=workers, rounds=rounds, seed=seed)
+        report = dict(result.to_dict(), sessions=len(problem.events), targets=len(problem.targets))
+        click.echo(json.dumps(report, indent=2))
+        if save:
+            if result.hard:
+                raise click.ClickException(f'{result.hard} session(s) could not be placed; nothing saved.')
+            save_solution(problem, result)
+            click.echo(f'Saved {len(result.placements)} schedule rows.')
+
+    @app.cli.command('import-schedule')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--strict', is_flag=True, help='Reject the whole file if any row is invalid.')
+    @click.option('--dry-run', is_flag=True, help='Only validate and report.')
+    def import_schedule(path, strict, dry_run):
+        """Bulk import schedule rows from a CSV, JSON or XLSX file."""
+        from patterns.schedule_import import read_schedule_file, import_schedules
+
+        try:
+            with open(path, 'rb') as stream:
+                frame = read_schedule_file(stream, path)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        report = import_schedules(frame, strict=strict, dry_run=dry_run)
+        for error in report.errors:
+            click.echo(f"ligne {error['row']} [{error['field']}] {error['message']}", err=True)
+        click.echo(f'{report.inserted}/{report.total} rows inserted, {len(report.rejected_rows)} rejected.')
+        if report.errors:
+            raise SystemExit(1)
+
+    @app.cli.command('export-pdfs')
+    @click.argument('path', type=click.Path(dir_okay=False, writable=True))
+    @click.option('--workers', type=int, default=None, help='Worker processes (default: PDF_EXPORT_WORKERS).')
+    def export_pdfs(path, workers):
+        """Write every program/year, group and teacher timetable PDF into a ZIP archive."""
+        from sqlalchemy.orm import joinedload
+        from core.models import Schedule, StudentGroup, Teacher
+        from patterns.pdf_export import faculty_documents, stream_pdf_bundle
+
+        schedules = Schedule.query.options(
+            joinedload(Schedule.group),
+            joinedload(Schedule.course),
+            joinedload(Schedule.teacher),
+            joinedload(Schedule.room),
+            joinedload(Schedule.program)
+        ).order_by(Schedule.day, Schedule.start_time).all()
+        teachers = Teacher.query.options(joinedload(Teacher.load)).order_by(Teacher.last_name, Teacher.first_name).all()
+        groups = StudentGroup.query.order_by(StudentGroup.name).all()
+        documents = faculty_documents(schedules, teachers, groups)
+
+        workers = workers if workers is not None else current_app.config['PDF_EXPORT_WORKERS']
+        with open(path, 'wb') as archive:
+            for chunk in stream_pdf_bundle(documents, workers=workers):
+                archive.write(chunk)
+        click.echo(f'{len(documents)} PDF written to {path}.')
+
+    @app.cli.command('startup-profile')
+    @click.option('--top', type=int, default=15, help='Number of slowest imports to list.')
+    @click.option('--max-ms', type=float, default=None, help='Fail if total import time exceeds this budget.')
+    def startup_profile(top, max_ms):
+        """Measure worker import time with `python -X importtime` and flag heavy eager imports."""
+        import subprocess
+        import sys
+
+        modules = 'app, routes.auth, routes.admin, routes.teacher, routes.student, routes.api'
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {modules}'],
+            cwd=current_app.root_path, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise click.ClickException(completed.stderr.strip().splitlines()[-1])
+
+        # Lines look like "import time:      self [us] |   cumulative | imported package"
+        entries = []
+        for line in completed.stderr.splitlines():
+            if not line.startswith('import time:') or 'imported package' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            entries.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+        total_ms = sum(self_us for _cumulative, self_us, _name in entries) / 1000
+        click.echo(f'Total import time: {total_ms:.1f} ms ({len(entries)} modules)')
+        for cumulative_us, _self_us, name in sorted(entries, reverse=True)[:top]:
+            click.echo(f'{cumulative_us / 1000:10.1f} ms  {name}')
+
+        loaded = {name.strip().split('.')[0] for _cumulative, _self, name in entries}
+        eager = sorted(loaded & set(current_app.config['STARTUP_LAZY_IMPORTS']))
+        if eager:
+            raise click.ClickException(f"Heavy modules imported at startup: {', '.join(eager)}")
+        if max_ms is not None and total_ms > max_ms:
+            raise click.ClickException(f'Import time {total_ms:.1f} ms exceeds the {max_ms:.1f} ms budget')
+
+    @app.cli.command('reconcile-teacher-loads')
+    @click.option('--dry-run', is_flag=True, help='Only report drift, leave the counters unchanged.')
+    def reconcile_teacher_loads_command(dry_run):
+        """Rebuild the per-teacher weekly load counters from the schedule and report drift."""
+        from core.extensions import db
+        from patterns.teacher_load import reconcile_teacher_loads
+
+        drift = reconcile_teacher_loads(db.session, dry_run=dry_run)
+        if not dry_run:
+            db.session.commit()
+        for teacher_id, stored, actual in drift:
+            stored_text = 'missing' if stored is None else f'{stored} min'
+            click.echo(f'teacher {teacher_id}: {stored_text} -> {actual} min')
+        click.echo(f"{len(drift)} counter(s) {'out of date' if dry_run else 'rebuilt'}.")
+
+    @app.cli.command('explain-schedule-queries')
+    def explain_schedule_queries():
+        """EXPLAIN the hot Schedule lookups and fail if one cannot use its index."""
+        from datetime import time
+        from sqlalchemy import select
+        from core.extensions import db
+        from core.models import Schedule
+        from core.schema import plan_indexes
+        from patterns.conflicts import overlaps
+
+        start, end = time(8, 30), time(10, 30)
+        checks = [
+            ('room overlap', 'ix_schedule_day_room_start',
+             select(Schedule.id).where(Schedule.day == 'Lundi', Schedule.room_id == 1, overlaps(start, end))),
+            ('teacher overlap', 'ix_schedule_day_teacher_start',
+             select(Schedule.id).where(Schedule.day == 'Lundi', Schedule.teacher_id == 1, overlaps(start, end))),
+            ('group overlap', 'ix_schedule_day_group_start',
+             select(Schedule.id).where(Schedule.day == 'Lundi', Schedule.group_id == 1, overlaps(start, end))),
+            ('program/year timetable', 'ix_schedule_program_year_group',
+             select(Schedule.id).where(Schedule.program_id == 1, Schedule.year == 1)),
+            ('student timetable', 'ix_schedule_program_year_group',
+             select(Schedule.id).where(Schedule.program_id == 1, Schedule.year == 1,
+                                       db.or_(Schedule.group_id == 1, Schedule.group_id.is_(None)))),
+        ]
+
+        missing = []
+        for label, index, statement in checks:
+            lines, indexes = plan_indexes(db.session, statement)
+            click.echo(f"{label}: {'ok' if index in indexes else 'NO INDEX'}")
+            for line in lines:
+                click.echo(f'    {line}')
+            if index not in indexes:
+                missing.append(f'{label} ({index})')
+        if missing:
+            raise click.ClickException(f"Index not usable for: {', '.join(missing)}")
+
+    @app.cli.command('benchmark-passwords')
+    @click.option('--method', 'methods', multiple=True,
+                  help='werkzeug hash method to measure (repeatable; default: the configured one and common settings).')
+    @click.option('--seconds', type=float, default=2.0, help='Measuring time per method and mode.')
+    @click.option('--threads', type=int, default=None, help='Concurrent verifiers for the pooled run (default: one per CPU core).')
+    def benchmark_passwords(methods, seconds, threads):
+        """Measure password verifications per second for each hashing setting."""
+        import os
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from werkzeug.security import check_password_hash
+        from core.security import canonical_method, hash_password
+
+        configured = canonical_method(current_app.config['PASSWORD_HASH_METHOD'])
+        if not methods:
+            methods = (configured, 'scrypt:16384:8:1', 'pbkdf2:sha256:600000', 'pbkdf2:sha256:1000000')
+        threads = threads or os.cpu_count() or 1
+
+        def run(pwhash, workers):
+            done, deadline = 0, time.perf_counter() + seconds
+            start = time.perf_counter()
+
+            def loop():
+                count = 0
+                while time.perf_counter() < deadline:
+                    check_password_hash(pwhash, 'benchmark-password')
+                    count += 1
+                return count
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                done = sum(executor.map(lambda _i: loop(), range(workers)))
+            return done / (time.perf_counter() - start)
+
+        report = []
+        for method in dict.fromkeys(canonical_method(m) for m in methods):
+            pwhash = hash_password('benchmark-password', method=method)
+            per_core = run(pwhash, 1)
+            report.append({
+                'method': method,
+                'configured': method == configured,
+                'ms_per_login': round(1000 / per_core, 2),
+                'logins_per_second_per_core': round(per_core, 1),
+                f'logins_per_second_{threads}_threads': round(run(pwhash, threads), 1)
+            })
+        click.echo(json.dumps({'cpu_count': os.cpu_count(), 'results': report}, indent=2))
+
+    @app.cli.command('send-emails')
+    @click.option('--loop', is_flag=True, help='Keep running as the outbox worker (use with OUTBOX_WORKER_THREAD = False).')
+    def send_emails(loop):
+        """Send the queued outbox emails and report the queue by status."""
+        from patterns.outbox import deliver_pending, outbox_counts, run_outbox
+
+        if loop:
+            run_outbox(current_app._get_current_object())
+            return
+        sent = 0
+        while True:
+            claimed = deliver_pending()
+            sent += claimed
+            if claimed < current_app.config['OUTBOX_BATCH_SIZE']:
+                break
+        click.echo(f'{sent} message(s) processed.')
+        for status, count in sorted(outbox_counts().items()):
+            click.echo(f'{status}: {count}')
+
+    @app.cli.command('import-teachers')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--strict', is_flag=True, help='Reject the whole file if any row is invalid.')
+    @click.option('--dry-run', is_flag=True, help='Only validate and report.')
+    @click.option('--email/--no-email', 'send_emails', default=True, help='Queue the welcome emails (default: yes).')
+    @click.option('--login-url', default=None, help='Login address written in the emails (default: built from SERVER_NAME).')
+    @click.option('--workers', type=int, default=None, help='Hashing processes (default: TEACHER_IMPORT_WORKERS).')
+    def import_teachers_command(path, strict, dry_run, send_emails, login_url, workers):
+        """Create teacher accounts in bulk from a CSV or XLSX file."""
+        from flask import url_for
+        from patterns.teacher_import import read_teacher_file, import_teachers
+
+        try:
+            with open(path, 'rb') as stream:
+                frame = read_teacher_file(stream, path)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        if send_emails and not login_url:
+            with current_app.test_request_context():
+                login_url = url_for('auth.login', _external=True)
+        workers = workers if workers is not None else current_app.config['TEACHER_IMPORT_WORKERS']
+        report = import_teachers(frame, current_app.config, strict=strict, dry_run=dry_run,
+                                 send_emails=send_emails, login_url=login_url, workers=workers)
+        for error in report.errors:
+            click.echo(f"ligne {error['row']} [{error['field']}] {error['message']}", err=True)
+        click.echo(f'{report.inserted}/{report.total} teachers created, {len(report.rejected_rows)} rejected.')
+        if report.errors:
+            raise SystemExit(1)
+
+    @app.cli.command('seed-synthetic')
+    @click.option('--departments', type=int, default=6, help='Departments to create.')
+    @click.option('--programs', type=int, default=4, help='Programs per department.')
+    @click.option('--groups', type=int, default=4, help='Student groups per program.')
+    @click.option('--courses', type=int, default=10, help='Courses per program.')
+    @click.option('--teachers', type=int, default=200, help='Teachers to create.')
+    @click.option('--rooms', type=int, default=80, help='Rooms to create.')
+    @click.option('--seed', type=int, default=0, help='Random seed; also tags the generated names.')
+    def seed_synthetic(departments, programs, groups, courses, teachers, rooms, seed):
+        """Fill the database with a conflict-free synthetic faculty (for benchmarks, not production)."""
+        from core.extensions import db
+        from patterns.synthetic import SYNTHETIC_PASSWORD, generate_dataset
+
+        try:
+            counts = generate_dataset(db.session, departments=departments, programs=programs, groups=groups,
+                                      courses=courses, teachers=teachers, rooms=rooms, seed=seed)
+        except ValueError as e:
+            db.session.rollback()
+            raise click.ClickException(str(e))
+        db.session.commit()
+        click.echo(json.dumps(counts, indent=2))
+        click.echo(f"Accounts syn{seed}t<n> (teachers) and syn{seed}s<n> (students), password '{SYNTHETIC_PASSWORD}'.")
+
+    @app.cli.command('benchmark')
+    @click.option('--repeat', type=int, default=5, help='Runs per scenario (the first is the cold one).')
+    @click.option('--baseline', 'baseline_path', default=None, help='Baseline JSON (default: BENCHMARK_BASELINE).')
+    @click.option('--update-baseline', is_flag=True, help='Write this run as the new baseline instead of comparing.')
+    @click.option('--tolerance', type=float, default=0.5, help='Allowed relative warm latency increase.')
+    @click.option('--slack-ms', type=float, default=5.0, help='Allowed absolute warm latency increase.')
+    def benchmark(repeat, baseline_path, update_baseline, tolerance, slack_ms):
+        """Time the hot endpoints and fail on regressions against the baseline."""
+        import os
+        from patterns.benchmark import compare, run_benchmarks
+
+        path = baseline_path or current_app.config['BENCHMARK_BASELINE']
+        if not os.path.isabs(path):
+            path = os.path.join(current_app.instance_path, path)
+        try:
+            report = run_benchmarks(current_app._get_current_object(), repeat=repeat)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        for name, result in report['results'].items():
+            click.echo(f"{name:26} cold {result['cold_ms']:9.2f} ms {result['cold_queries']:4} q   "
+                       f"warm {result['warm_ms']:9.2f} ms {result['warm_queries']:4} q")
+
+        if update_baseline or not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as stream:
+                json.dump(report, stream, indent=2)
+            click.echo(f'Baseline written to {path}.')
+            return
+        with open(path) as stream:
+            baseline = json.load(stream)
+        problems = compare(report, baseline, tolerance=tolerance, slack_ms=slack_ms)
+        if problems:
+            raise click.ClickException('Regressions against the baseline:\n' + '\n'.join(problems))
+        click.echo(f'No regression against {path}.')
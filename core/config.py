@@ -4,6 +4,75 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = 'uploads'
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+    # Connection pool (pool size, overflow and timeout are ignored for SQLite); recycle stays under MySQL's wait_timeout
+    SQLALCHEMY_POOL_SIZE = 10
+    SQLALCHEMY_MAX_OVERFLOW = 20
+    SQLALCHEMY_POOL_TIMEOUT = 30
+    SQLALCHEMY_POOL_RECYCLE = 280
+    SQLALCHEMY_POOL_PRE_PING = True
+    # Read replica for the read-only views (None = everything on the primary), and seconds a
+    # browser keeps reading from the primary after one of its requests committed a change
+    SQLALCHEMY_REPLICA_URI = None
+    READ_REPLICA_STICKY_SECONDS = 10
+    # Timetable generator: search time per run (seconds) and semester length (weeks)
+    TIMETABLE_TIME_BUDGET = 10
+    SEMESTER_WEEKS = 15
+    # Longest search run inside a web request: keep it well below the WSGI worker timeout (gunicorn: 30 s),
+    # loading and saving included; longer searches go through `flask generate-timetable`
+    TIMETABLE_MAX_REQUEST_BUDGET = 20
+    # Worker processes for `flask generate-timetable` (None = one per CPU core)
+    TIMETABLE_WORKERS = None
+    # Worker processes rendering the faculty-wide PDF bundle (None = one per CPU core)
+    PDF_EXPORT_WORKERS = None
+    # Processes hashing passwords during a bulk teacher import (None = one per CPU core)
+    TEACHER_IMPORT_WORKERS = None
+    # Version of the deployed code in the page ETags, e.g. the git commit (None = newest template modification time)
+    BUILD_ID = None
+    # Generated PDF cache (directory relative to the instance folder, size bound in bytes)
+    PDF_CACHE_DIR = 'pdf_cache'
+    PDF_CACHE_MAX_BYTES = 200 * 1024 * 1024
+    # Rendered teacher chart images (same layout as the PDF cache)
+    CHART_CACHE_DIR = 'chart_cache'
+    CHART_CACHE_MAX_BYTES = 20 * 1024 * 1024
+    # Timetable grids kept in memory per worker for the dashboards (entries, least recently used evicted)
+    TIMETABLE_CACHE_SIZE = 500
+    # First Monday of the semester for the .ics feeds ('YYYY-MM-DD'; None = the current week, repeating weekly)
+    SEMESTER_START = None
+    # Seconds calendar clients may reuse a feed before revalidating it
+    CALENDAR_FEED_MAX_AGE = 300
+    # Generated .ics feeds (same layout as the PDF cache)
+    CALENDAR_CACHE_DIR = 'calendar_cache'
+    CALENDAR_CACHE_MAX_BYTES = 20 * 1024 * 1024
+    # Largest page the JSON API returns (?limit= is capped to it)
+    API_MAX_PAGE_SIZE = 200
+    # Logged-in user snapshots kept per worker (seconds before a change made in another worker shows, entries)
+    IDENTITY_CACHE_TTL = 30
+    IDENTITY_CACHE_SIZE = 1000
+    # Password hashing (werkzeug method string); hashes made with other parameters are redone at the next login
+    PASSWORD_HASH_METHOD = 'scrypt:32768:8:1'
+    PASSWORD_SALT_LENGTH = 16
+    # Threads verifying passwords at login (0 = on the request thread), logins allowed to wait
+    # for one, and seconds a login waits for a slot before being answered 503
+    PASSWORD_VERIFY_WORKERS = 0
+    PASSWORD_VERIFY_QUEUE = 16
+    PASSWORD_VERIFY_TIMEOUT = 5
+    # Per-request SQL profiling: Server-Timing header, N+1 warnings and the admin SQL report
+    SQL_PROFILE = True
+    SQL_SERVER_TIMING = True
+    # Same statement (values aside) run this many times in one request is logged as a likely N+1
+    SQL_REPEAT_THRESHOLD = 5
+    # Statements allowed per request unless the view sets its own with @query_budget (None: no limit)
+    SQL_QUERY_BUDGET = 50
+    # Raise QueryBudgetExceeded instead of only reporting (development and tests)
+    SQL_PROFILE_STRICT = False
+    SQL_REPORT_STATEMENTS = 20
+    # Prometheus metrics at /metrics, served to these client addresses only (set PROMETHEUS_MULTIPROC_DIR under gunicorn)
+    METRICS_ENABLED = True
+    METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+    # Results of `flask benchmark` compared against (relative to the instance folder)
+    BENCHMARK_BASELINE = 'benchmark_baseline.json'
+    # Libraries that must only be imported on first use (checked by `flask startup-profile`)
+    STARTUP_LAZY_IMPORTS = ('matplotlib', 'numpy', 'pandas', 'reportlab')
     # Email configuration
     MAIL_SERVER = 'smtp.yourprovider.com'
     MAIL_PORT = 587
@@ -11,3 +80,14 @@ class Config:
     MAIL_USERNAME = 'your@email.com'
     MAIL_PASSWORD = 'yourpassword'
     MAIL_DEFAULT_SENDER = 'your@email.com'
+    # Email outbox: messages per SMTP connection, attempts before a message is marked failed,
+    # retry delay (seconds, doubled per attempt up to the maximum), seconds a claimed batch
+    # is reserved for its worker, and seconds between polls of the background thread
+    OUTBOX_BATCH_SIZE = 50
+    OUTBOX_MAX_ATTEMPTS = 6
+    OUTBOX_RETRY_DELAY = 60
+    OUTBOX_RETRY_MAX_DELAY = 3600
+    OUTBOX_LEASE_SECONDS = 300
+    OUTBOX_POLL_INTERVAL = 30
+    # Send from a thread of each web worker; set False when `flask send-emails --loop` runs separately
+    OUTBOX_WORKER_THREAD = True
@@ -0,0 +1,97 @@
+# database.py
+import time
+from functools import wraps
+
+from flask import current_app, has_request_context, request, session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+
+from core.extensions import db
+from core.metrics import POOL_CHECKOUT_SECONDS, POOL_IN_USE, POOL_TIMEOUTS
+
+# Bind key of the read replica engine in SQLALCHEMY_BINDS
+REPLICA_BIND = 'replica'
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool reporting checkout time, timeouts and connections in use, labelled by its logging name."""
+    def _do_get(self):
+        bind = self.logging_name or 'primary'
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.labels(bind).inc()
+            raise
+        POOL_CHECKOUT_SECONDS.labels(bind).observe(time.perf_counter() - started)
+        POOL_IN_USE.labels(bind).set(self.checkedout())
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        POOL_IN_USE.labels(self.logging_name or 'primary').set(self.checkedout())
+
+def _engine_options(url, config, bind):
+    """Pool settings for one engine; SQLite keeps its own pool classes and only gets pre-ping/recycle."""
+    options = {
+        'pool_pre_ping': config['SQLALCHEMY_POOL_PRE_PING'],
+        'pool_recycle': config['SQLALCHEMY_POOL_RECYCLE']
+    }
+    if not make_url(url).drivername.startswith('sqlite'):
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_logging_name=bind,
+            pool_size=config['SQLALCHEMY_POOL_SIZE'],
+            max_overflow=config['SQLALCHEMY_MAX_OVERFLOW'],
+            pool_timeout=config['SQLALCHEMY_POOL_TIMEOUT']
+        )
+    return options
+
+def configure_engines(app):
+    """Fill SQLALCHEMY_ENGINE_OPTIONS from the pool settings and add the replica bind (call before db.init_app)."""
+    config = app.config
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(
+        _engine_options(config['SQLALCHEMY_DATABASE_URI'], config, 'primary'),
+        **config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    )
+    replica = config.get('SQLALCHEMY_REPLICA_URI')
+    if replica:
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        binds[REPLICA_BIND] = dict(_engine_options(replica, config, REPLICA_BIND), url=replica)
+        config['SQLALCHEMY_BINDS'] = binds
+
+def read_replica(f):
+    """Send the SELECTs of a GET/HEAD view to the read replica.
+
+    Writes always go to the primary, and so do all reads of a browser
+    session for READ_REPLICA_STICKY_SECONDS after it committed a change
+    (read-your-writes), or of a request once it has written. Without
+    SQLALCHEMY_REPLICA_URI this does nothing.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or session.get('_primary_until', 0) > time.time():
+            return f(*args, **kwargs)
+        previous = db.session.info.get('read_replica')
+        db.session.info['read_replica'] = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            db.session.info['read_replica'] = previous
+    return decorated_function
+
+@event.listens_for(Session, 'after_flush')
+def _mark_written(session_, flush_context):
+    session_.info['wrote'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _stick_to_primary(session_):
+    if session_.info.pop('wrote', False) and has_request_context():
+        session['_primary_until'] = time.time() + current_app.config['READ_REPLICA_STICKY_SECONDS']
+        session_.info['read_replica'] = False  # the rest of this request reads its own writes too
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_written(session_):
+    session_.info.pop('wrote', None)
@@ -1,5 +1,8 @@
 # extensions.py
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import UpdateBase
 from flask_login import LoginManager
 from flask_mail import Mail
 
@@ -11,12 +14,24 @@ class Singleton(type):
             cls._instances[cls] = super(Singleton, cls).__call__(*args, **kwargs)
         return cls._instances[cls]
 
+class RoutingSession(Session):
+    """Session sending plain SELECTs to the 'replica' bind while `info['read_replica']` is set (see core.database)."""
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if isinstance(clause, UpdateBase):
+            self.info['wrote'] = True  # Core writes skip the flush hooks
+        elif (bind is None and self.info.get('read_replica') and not self.info.get('wrote')
+              and not self._flushing and isinstance(clause, Select) and clause._for_update_arg is None):
+            replica = self._db.engines.get('replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
 # Singleton-enabled instances
 class DB(SQLAlchemy, metaclass=Singleton): pass
 class Login(LoginManager, metaclass=Singleton): pass
 class Mailer(Mail, metaclass=Singleton): pass
 
-db = DB()
+db = DB(session_options={'class_': RoutingSession})
 login_manager = Login()
 mail = Mailer()
 
@@ -0,0 +1,110 @@
+# identity.py
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from flask_login import UserMixin, current_user
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from core.extensions import db, login_manager
+from core.metrics import record_cache
+from core.models import Teacher, User
+
+class UserPrincipal(UserMixin):
+    """Read-only snapshot of a logged-in user, shared between requests.
+
+    Holds what the role checks, templates and timetable queries read; code
+    that needs the database row (to change it, or for a relationship) gets
+    it from current_user_record().
+    """
+    def __init__(self, id, username, role, program_id, year, group_id, teacher_id, calendar_token):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.program_id = program_id
+        self.year = year
+        self.group_id = group_id
+        self.teacher_id = teacher_id
+        self.calendar_token = calendar_token
+
+class IdentityCache:
+    """Per-process LRU of UserPrincipal with a time-to-live.
+
+    A committed change to a user or teacher drops the entry in this
+    process right away; other worker processes pick it up when their
+    entry expires, after at most IDENTITY_CACHE_TTL seconds.
+    """
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, load, ttl, max_entries):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                record_cache('identity', True)
+                return entry[0]
+        record_cache('identity', False)
+        principal = load(user_id)
+        if principal is not None:
+            with self._lock:
+                self._entries[user_id] = (principal, now + ttl)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > max_entries:
+                    self._entries.popitem(last=False)
+        return principal
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+identity_cache = IdentityCache()
+
+def _load_principal(user_id):
+    # Always read from the primary: a lagging replica would keep a stale principal for the whole TTL
+    row = db.session.execute(
+        select(User.id, User.username, User.role, User.program_id, User.year, User.group_id,
+               Teacher.id, User.calendar_token)
+        .outerjoin(Teacher, Teacher.user_id == User.id).where(User.id == user_id),
+        bind_arguments={'bind': db.engine}
+    ).first()
+    return UserPrincipal(*row) if row else None
+
+@login_manager.user_loader
+def load_user(user_id):
+    config = current_app.config
+    return identity_cache.get(int(user_id), _load_principal,
+                              config['IDENTITY_CACHE_TTL'], config['IDENTITY_CACHE_SIZE'])
+
+def current_user_record():
+    """The logged-in user's User row (from the session's identity map when already loaded)."""
+    return db.session.get(User, int(current_user.get_id()))
+
+@event.listens_for(Session, 'after_flush')
+def _collect_identity_changes(session, flush_context):
+    changed = session.info.setdefault('identity_users', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            changed.add(obj.id)
+        elif isinstance(obj, Teacher):
+            changed.add(obj.user_id)
+            changed.update(inspect(obj).attrs.user_id.history.deleted)
+
+@event.listens_for(Session, 'after_commit')
+def _apply_identity_changes(session):
+    changed = session.info.pop('identity_users', None)
+    if changed:
+        identity_cache.invalidate(changed)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_identity_changes(session):
+    session.info.pop('identity_users', None)
@@ -0,0 +1,99 @@
+# metrics.py
+import os
+import time
+
+from flask import Response, abort, current_app, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+from prometheus_client.core import GaugeMetricFamily
+
+# Set (to an empty directory, before the app is imported) to aggregate the metrics of every gunicorn worker
+MULTIPROC_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Request latency by endpoint (blueprint.view)',
+    ['endpoint', 'method', 'status']
+)
+POOL_CHECKOUT_SECONDS = Histogram(
+    'db_pool_checkout_seconds', 'Time to get a connection from the pool, waiting included',
+    ['bind'], buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+)
+POOL_TIMEOUTS = Counter('db_pool_timeouts', 'Checkouts that gave up after SQLALCHEMY_POOL_TIMEOUT', ['bind'])
+POOL_IN_USE = Gauge('db_pool_connections_in_use', 'Connections checked out of the pool', ['bind'],
+                    multiprocess_mode='livesum')
+RENDER_SECONDS = Histogram(
+    'render_duration_seconds', 'Time to draw an artifact on a cache miss', ['artifact'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+CACHE_LOOKUPS = Counter('cache_lookups', 'Cache lookups by cache and result (hit ratio = hit / all)',
+                        ['cache', 'result'])
+
+def record_cache(cache, hit):
+    CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc()
+
+class OutboxCollector:
+    """Email queue depth, read from the database at scrape time (the same for every worker)."""
+    def collect(self):
+        from patterns.outbox import outbox_counts
+
+        family = GaugeMetricFamily('outbox_messages', 'Emails in the outbox by status', labels=['status'])
+        for status, count in sorted(outbox_counts().items()):
+            family.add_metric([status], count)
+        yield family
+
+def _registry():
+    """Metrics of this process, or of all workers when PROMETHEUS_MULTIPROC_DIR is set."""
+    if os.environ.get(MULTIPROC_ENV):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+def child_exit(server, worker):
+    """gunicorn hook (`child_exit = core.metrics.child_exit` in gunicorn.conf.py): drop a dead worker's live gauges."""
+    if os.environ.get(MULTIPROC_ENV):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+def init_metrics(app):
+    """Time every request and serve the metrics at /metrics when METRICS_ENABLED is on.
+
+    /metrics answers 404 unless the client address is in
+    METRICS_ALLOWED_IPS and the request did not come through a proxy
+    (X-Forwarded-For), so it stays reachable from the host only.
+    """
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            REQUEST_SECONDS.labels(request.endpoint or 'unmatched', request.method,
+                                   response.status_code).observe(time.perf_counter() - started)
+        return response
+
+    @app.teardown_request
+    def observe_failed_request(exc):
+        # Still set when the view raised and after_request was skipped
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            REQUEST_SECONDS.labels(request.endpoint or 'unmatched', request.method,
+                                   500).observe(time.perf_counter() - started)
+
+    @app.route('/metrics')
+    def metrics():
+        if (request.remote_addr not in current_app.config['METRICS_ALLOWED_IPS']
+                or 'X-Forwarded-For' in request.headers):
+            abort(404)
+        scrape = CollectorRegistry(auto_describe=False)
+        scrape.register(OutboxCollector())
+        return Response(generate_latest(_registry()) + generate_latest(scrape), content_type=CONTENT_TYPE_LATEST)
@@ -1,11 +1,8 @@
+import secrets
 from datetime import datetime
-from core.extensions import db, login_manager
+from core.extensions import db
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
-
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
+from core.security import hash_password, needs_rehash, verify_password
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -15,16 +12,34 @@ class User(db.Model, UserMixin):
     role = db.Column(db.String(20), nullable=False)  # admin, teacher, student
     program_id = db.Column(db.Integer, db.ForeignKey('program.id'), nullable=True)  # For students
     year = db.Column(db.Integer, nullable=True)  # For students (e.g., 1, 2, 3)
+    group_id = db.Column(db.Integer, db.ForeignKey('student_group.id'), nullable=True)  # For students
+    calendar_token = db.Column(db.String(64), unique=True, index=True)  # Secret part of the .ics feed URL
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     program = db.relationship('Program', backref=db.backref('users', lazy=True))
+    group = db.relationship('StudentGroup', backref=db.backref('students', lazy=True))
     teacher = db.relationship('Teacher', backref='user', uselist=False)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """True when the stored hash predates the configured PASSWORD_HASH_METHOD."""
+        return needs_rehash(self.password_hash)
+
+    @property
+    def teacher_id(self):
+        """Same attribute as on core.identity.UserPrincipal."""
+        return self.teacher.id if self.teacher else None
+
+    def calendar_feed_token(self, renew=False):
+        """Token of the user's calendar feed URL, created on first use (the caller commits)."""
+        if renew or not self.calendar_token:
+            self.calendar_token = secrets.token_urlsafe(32)
+        return self.calendar_token
 
 class Department(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -97,4 +112,45 @@ class Schedule(db.Model):
     program = db.relationship('Program', backref=db.backref('schedules', lazy=True))
     course = db.relationship('Course', backref=db.backref('schedules', lazy=True))
     teacher = db.relationship('Teacher', backref=db.backref('schedules', lazy=True))
-    room = db.relationship('Room', backref=db.backref('schedules', lazy=True))
\ No newline at end of file
+    room = db.relationship('Room', backref=db.backref('schedules', lazy=True))
+
+    __table_args__ = (
+        # Overlap lookups: equality on (day, resource), range on start_time
+        db.Index('ix_schedule_day_room_start', 'day', 'room_id', 'start_time'),
+        db.Index('ix_schedule_day_teacher_start', 'day', 'teacher_id', 'start_time'),
+        db.Index('ix_schedule_day_group_start', 'day', 'group_id', 'start_time'),
+        # Program/year timetables; the group_id suffix serves student timetables
+        db.Index('ix_schedule_program_year_group', 'program_id', 'year', 'group_id'),
+    )
+
+class DataVersion(db.Model):
+    """Change counter per table, bumped right after the change commits (see core.cache)."""
+    scope = db.Column(db.String(50), primary_key=True)  # table name, e.g. "schedule"
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)  # time of the last bump (Last-Modified)
+
+class TeacherLoad(db.Model):
+    """Scheduled minutes per week for a teacher, kept in step with Schedule (see patterns.teacher_load)."""
+    teacher_id = db.Column(db.Integer, db.ForeignKey('teacher.id', ondelete='CASCADE'), primary_key=True)
+    minutes = db.Column(db.Integer, nullable=False, default=0)
+
+    teacher = db.relationship('Teacher', backref=db.backref('load', uselist=False, lazy=True, cascade='all, delete-orphan'))
+
+class OutboxMessage(db.Model):
+    """Email waiting to be sent by the outbox worker (see patterns.outbox)."""
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(255), nullable=False)
+    recipients = db.Column(db.Text, nullable=False)  # comma-separated addresses
+    body = db.Column(db.Text, nullable=False)  # emptied once sent (it may contain a password)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_by = db.Column(db.String(32))  # worker batch currently sending it
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # The worker picks due messages by status and time
+        db.Index('ix_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
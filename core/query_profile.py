@@ -0,0 +1,165 @@
+# query_profile.py
+import re
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Literals and bound parameters, replaced by '?' so that the same statement with other values shares a fingerprint
+_LITERALS = re.compile(r"'(?:[^']|'')*'|%\(\w+\)s|%s|:\w+|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+_SPACES = re.compile(r'\s+')
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in SQL_PROFILE_STRICT mode by the statement that takes a request over its query budget."""
+
+def fingerprint(statement):
+    """`statement` with its values and IN lists collapsed, e.g. 'SELECT ... WHERE course.id = ?'."""
+    statement = _LITERALS.sub('?', statement)
+    return _SPACES.sub(' ', _IN_LISTS.sub('(?)', statement)).strip()
+
+def query_budget(limit):
+    """Decorator giving a view its own query budget instead of SQL_QUERY_BUDGET."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            return f(*args, **kwargs)
+        decorated_function.query_budget = limit
+        return decorated_function
+    return decorator
+
+class RequestProfile:
+    """SQL statements run by one request: count, time and repeats per fingerprint."""
+    def __init__(self, endpoint, budget, strict):
+        self.endpoint = endpoint
+        self.budget = budget
+        self.strict = strict
+        self.started = time.perf_counter()
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints = Counter()
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.fingerprints[fingerprint(statement)] += 1
+        if self.strict and self.budget is not None and self.count > self.budget:
+            self.strict = False  # raise once; the error handling may still query
+            raise QueryBudgetExceeded(
+                f'{self.endpoint}: {self.count} requêtes SQL pour un budget de {self.budget}'
+            )
+
+    def repeated(self, threshold):
+        """Fingerprints run at least `threshold` times, most repeated first (N+1 suspects)."""
+        return [(sql, n) for sql, n in self.fingerprints.most_common() if n >= threshold]
+
+class QueryReport:
+    """Per-process totals by endpoint, shown on the admin SQL report.
+
+    Each worker process keeps its own figures, from its start or the last
+    reset; repeated statements keep the SQL_REPORT_STATEMENTS most frequent
+    per endpoint.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.since = time.time()
+
+    def add(self, profile, repeated, max_statements):
+        elapsed_ms = profile.seconds * 1000
+        with self._lock:
+            entry = self._endpoints.setdefault(profile.endpoint, {
+                'endpoint': profile.endpoint, 'requests': 0, 'queries': 0, 'max_queries': 0,
+                'db_ms': 0.0, 'max_db_ms': 0.0, 'over_budget': 0, 'budget': profile.budget, 'repeated': {}
+            })
+            entry['requests'] += 1
+            entry['queries'] += profile.count
+            entry['max_queries'] = max(entry['max_queries'], profile.count)
+            entry['db_ms'] += elapsed_ms
+            entry['max_db_ms'] = max(entry['max_db_ms'], elapsed_ms)
+            entry['budget'] = profile.budget
+            if profile.budget is not None and profile.count > profile.budget:
+                entry['over_budget'] += 1
+            for sql, n in repeated:
+                requests, most = entry['repeated'].get(sql, (0, 0))
+                entry['repeated'][sql] = (requests + 1, max(most, n))
+            if len(entry['repeated']) > max_statements:
+                kept = sorted(entry['repeated'].items(), key=lambda item: item[1], reverse=True)[:max_statements]
+                entry['repeated'] = dict(kept)
+
+    def snapshot(self):
+        """Endpoint totals, the ones with most queries per request first."""
+        with self._lock:
+            entries = [dict(entry, repeated=sorted(
+                ((sql, requests, most) for sql, (requests, most) in entry['repeated'].items()),
+                key=lambda item: (item[1], item[2]), reverse=True
+            )) for entry in self._endpoints.values()]
+        for entry in entries:
+            entry['avg_queries'] = entry['queries'] / entry['requests']
+            entry['avg_db_ms'] = entry['db_ms'] / entry['requests']
+        return sorted(entries, key=lambda entry: entry['avg_queries'], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self.since = time.time()
+
+query_report = QueryReport()
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._profile_started = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_profile_started', None)
+    if started is None or not has_app_context():
+        return
+    profile = g.get('query_profile')
+    if profile is not None:
+        profile.record(statement, time.perf_counter() - started)
+
+def init_query_profile(app):
+    """Profile the SQL of every request when SQL_PROFILE is on.
+
+    Adds a Server-Timing header (db time and statement count, then the
+    whole request) when SQL_SERVER_TIMING is set, logs the statements run
+    SQL_REPEAT_THRESHOLD times or more in one request, and feeds the admin
+    SQL report. With SQL_PROFILE_STRICT, the statement over the endpoint's
+    budget raises QueryBudgetExceeded. Statements run while streaming a
+    response body are not counted.
+    """
+    if not app.config['SQL_PROFILE']:
+        return
+
+    @app.before_request
+    def start_query_profile():
+        view = current_app.view_functions.get(request.endpoint)
+        config = current_app.config
+        g.query_profile = RequestProfile(
+            request.endpoint,
+            getattr(view, 'query_budget', config['SQL_QUERY_BUDGET']),
+            config['SQL_PROFILE_STRICT']
+        )
+
+    @app.after_request
+    def report_query_profile(response):
+        profile = g.pop('query_profile', None)
+        if profile is None:
+            return response
+        config = current_app.config
+        repeated = profile.repeated(config['SQL_REPEAT_THRESHOLD'])
+        for sql, n in repeated:
+            current_app.logger.warning(f'{profile.endpoint}: requête répétée {n} fois (N+1 ?) : {sql}')
+        if profile.endpoint is not None:
+            query_report.add(profile, repeated, config['SQL_REPORT_STATEMENTS'])
+        if config['SQL_SERVER_TIMING']:
+            total_ms = (time.perf_counter() - profile.started) * 1000
+            response.headers.add('Server-Timing', f'db;dur={profile.seconds * 1000:.2f};desc="{profile.count} queries"')
+            response.headers.add('Server-Timing', f'app;dur={total_ms:.2f}')
+        return response
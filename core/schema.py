@@ -0,0 +1,74 @@
+# schema.py
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from core.extensions import db
+
+# Columns added to tables that already exist in deployed databases; db.create_all() only creates missing tables
+ADDED_COLUMNS = (
+    ('user', 'group_id'),
+    ('user', 'calendar_token'),
+    ('data_version', 'updated_at'),
+)
+
+def upgrade_schema():
+    """Add the columns and indexes declared on the models but missing from the database.
+
+    Only additive changes are made, so running it on every start is safe.
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    tables = set(inspector.get_table_names())
+
+    with engine.begin() as connection:
+        for table_name, column_name in ADDED_COLUMNS:
+            if table_name not in tables:
+                continue
+            if column_name in {column['name'] for column in inspector.get_columns(table_name)}:
+                continue
+            column = db.metadata.tables[table_name].c[column_name]
+            column_type = column.type.compile(dialect=engine.dialect)
+            connection.execute(text(f'ALTER TABLE {quote(table_name)} ADD COLUMN {quote(column_name)} {column_type}'))
+            print(f"Column {table_name}.{column_name} added!")
+
+        for table in db.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(connection)
+                    print(f"Index {index.name} created!")
+
+class explain(Executable, ClauseElement):
+    """`EXPLAIN <statement>` (EXPLAIN QUERY PLAN on SQLite), executable like any statement."""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+@compiles(explain)
+def _explain_default(element, compiler, **kw):
+    return 'EXPLAIN ' + compiler.process(element.statement, **kw)
+
+@compiles(explain, 'sqlite')
+def _explain_sqlite(element, compiler, **kw):
+    return 'EXPLAIN QUERY PLAN ' + compiler.process(element.statement, **kw)
+
+def plan_indexes(session, statement):
+    """Execute EXPLAIN for `statement`; return (plan lines, names of the indexes it can use)."""
+    result = session.execute(explain(statement))
+    rows = [row._mapping for row in result]
+    dialect = session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        lines = [row['detail'] for row in rows]
+        indexes = {line.split(' INDEX ')[1].split()[0] for line in lines if ' INDEX ' in line}
+    elif dialect == 'mysql':
+        lines = [f"{row['table']}: type={row['type']} key={row['key']} possible_keys={row['possible_keys']}" for row in rows]
+        indexes = {name for row in rows for name in (row['possible_keys'] or '').split(',') + [row['key'] or ''] if name}
+    else:
+        lines = [str(tuple(row.values())) for row in rows]
+        indexes = {word for line in lines for word in line.split() if word.startswith('ix_')}
+    return lines, indexes
@@ -0,0 +1,91 @@
+# security.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+class LoginBusyError(RuntimeError):
+    """Every password verification slot is taken (the login is answered with 503)."""
+
+def canonical_method(method):
+    """Spell a werkzeug hash method with all its parameters, e.g. 'scrypt' -> 'scrypt:32768:8:1'.
+
+    Stored hashes always carry the full form, so this is what they are
+    compared against to decide whether they need a rehash.
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        n, r, p = args if args else (2 ** 15, 8, 1)
+        return f'scrypt:{int(n)}:{int(r)}:{int(p)}'
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{int(iterations)}'
+    raise ValueError(f"Invalid hash method '{method}'.")
+
+def hash_password(password, method=None):
+    config = current_app.config
+    return generate_password_hash(
+        password,
+        method=canonical_method(method or config['PASSWORD_HASH_METHOD']),
+        salt_length=config['PASSWORD_SALT_LENGTH']
+    )
+
+def needs_rehash(pwhash):
+    """True when a stored hash was made with other parameters than PASSWORD_HASH_METHOD / PASSWORD_SALT_LENGTH."""
+    if not pwhash or pwhash.count('$') < 2:
+        return True
+    method, salt, _hash = pwhash.split('$', 2)
+    config = current_app.config
+    return (method != canonical_method(config['PASSWORD_HASH_METHOD'])
+            or len(salt) != config['PASSWORD_SALT_LENGTH'])
+
+class _VerifierPool:
+    """Bounded thread pool for password checks.
+
+    At most `workers` hashes run at once and at most `queue` more wait;
+    a login that finds no free slot within the timeout gets LoginBusyError
+    instead of tying up its request thread. hashlib releases the GIL while
+    hashing, so the other requests keep being served meanwhile.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self._size = None
+
+    def _get(self, workers, queue):
+        with self._lock:
+            if self._size != (workers, queue):
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password')
+                self._slots = threading.BoundedSemaphore(workers + queue)
+                self._size = (workers, queue)
+            return self._executor, self._slots
+
+    def check(self, pwhash, password, workers, queue, timeout):
+        executor, slots = self._get(workers, queue)
+        if not slots.acquire(timeout=timeout):
+            raise LoginBusyError('Too many concurrent logins')
+        try:
+            future = executor.submit(check_password_hash, pwhash, password)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _future: slots.release())
+        return future.result()
+
+_verifier_pool = _VerifierPool()
+
+def verify_password(pwhash, password):
+    """check_password_hash, run in the verifier pool when PASSWORD_VERIFY_WORKERS is set."""
+    if not pwhash:
+        return False
+    config = current_app.config
+    workers = config['PASSWORD_VERIFY_WORKERS']
+    if not workers:
+        return check_password_hash(pwhash, password)
+    return _verifier_pool.check(pwhash, password, workers,
+                                config['PASSWORD_VERIFY_QUEUE'], config['PASSWORD_VERIFY_TIMEOUT'])
@@ -1,6 +1,19 @@
+import multiprocessing
+
 from flask_mail import Message
 from core.extensions import mail
-from flask import current_app
+from flask import current_app, url_for
+from patterns.outbox import queue_email
+
+def process_context():
+    """Start method for worker process pools used from the web app.
+
+    Forking a threaded web worker copies locks held by other threads (the
+    outbox sender, pool checkouts) and open database connections into the
+    child; a forkserver (spawn where unavailable) starts children clean.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
 
 def send_email(subject, recipients, body):
     msg = Message(
@@ -10,3 +23,45 @@ def send_email(subject, recipients, body):
         sender=current_app.config['MAIL_DEFAULT_SENDER']
     )
     mail.send(msg)
+
+def teacher_account_email(email, username, password, first_name, last_name, login_url=None):
+    """(subject, recipients, body) of the new teacher account email; `login_url` defaults to the current request's login page."""
+    subject = "Votre compte enseignant a été créé"
+    body = f"""
+    Bonjour {first_name} {last_name},
+
+    Votre compte enseignant a été créé avec les informations suivantes :
+
+    Identifiant: {username}
+    Mot de passe: {password}
+    Email: {email}
+
+    Vous pouvez vous connecter à l'adresse: {login_url or url_for('auth.login', _external=True)}
+
+    Cordialement,
+    L'administration
+    """
+    return subject, [email], body
+
+def send_teacher_account_email(email, username, password, first_name, last_name):
+    """Queue the email for a new teacher account."""
+    queue_email(*teacher_account_email(email, username, password, first_name, last_name))
+
+def send_teacher_update_email(email, username, password, first_name, last_name):
+    """Queue the email for an updated teacher account."""
+    subject = "Votre compte enseignant a été mis à jour"
+    body = f"""
+    Bonjour {first_name} {last_name},
+
+    Votre compte enseignant a été mis à jour avec les informations suivantes :
+
+    Identifiant: {username}
+    Nouveau mot de passe: {password}
+    Email: {email}
+
+    Vous pouvez vous connecter à l'adresse: {url_for('auth.login', _external=True)}
+
+    Cordialement,
+    L'administration
+    """
+    queue_email(subject, [email], body)
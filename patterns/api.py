@@ -0,0 +1,120 @@
+# api.py
+import base64
+import json
+from datetime import date, datetime, time
+
+from sqlalchemy.orm import joinedload, load_only
+
+class ApiError(ValueError):
+    """Invalid API request parameter (answered with 400)."""
+
+class ApiResource:
+    """Read-only JSON view of a model.
+
+    `fields` are the column attributes that may be requested, `relations`
+    maps a name to (relationship attribute name, foreign key column, related
+    ApiResource) for many-to-one links, and `filters` maps a query
+    parameter to (column name, converter).
+    """
+    def __init__(self, model, fields, relations=None, filters=None):
+        self.model = model
+        self.fields = list(fields)
+        self.relations = relations or {}
+        self.filters = filters or {}
+
+    def parse_fields(self, value):
+        """Split `?fields=id,day,course.name` into ([columns], {relation: [columns]})."""
+        if not value:
+            return list(self.fields), {}
+        columns, related = [], {}
+        for name in (part.strip() for part in value.split(',')):
+            if not name:
+                continue
+            relation, _dot, subfield = name.partition('.')
+            if not _dot and relation in self.fields:
+                columns.append(relation)
+            elif relation in self.relations:
+                target = self.relations[relation][2]
+                if not subfield:
+                    related[relation] = list(target.fields)
+                elif subfield not in target.fields:
+                    raise ApiError(f'Champ inconnu : {name}')
+                elif subfield not in related.setdefault(relation, []):
+                    related[relation].append(subfield)
+            else:
+                raise ApiError(f'Champ inconnu : {name}')
+        return columns, related
+
+    def query(self, columns, related):
+        """Query loading only the requested columns, joining exactly the requested relations."""
+        loaded = {'id', *columns, *(self.relations[name][1] for name in related)}
+        options = [load_only(*(getattr(self.model, name) for name in loaded))]
+        for name, subfields in related.items():
+            attribute, _foreign_key, target = self.relations[name]
+            options.append(joinedload(getattr(self.model, attribute)).load_only(
+                *(getattr(target.model, field) for field in {'id', *subfields})
+            ))
+        return self.model.query.options(*options)
+
+    def apply_filters(self, query, args):
+        for parameter, (column, convert) in self.filters.items():
+            value = args.get(parameter)
+            if value in (None, ''):
+                continue
+            try:
+                value = convert(value)
+            except ValueError:
+                raise ApiError(f'Valeur invalide pour {parameter}.')
+            query = query.filter(getattr(self.model, column) == value)
+        return query
+
+    def serialize(self, obj, columns, related):
+        item = {name: _json_value(getattr(obj, name)) for name in columns}
+        for name, subfields in related.items():
+            target = getattr(obj, self.relations[name][0])
+            item[name] = None if target is None else {field: _json_value(getattr(target, field)) for field in subfields}
+        return item
+
+def _json_value(value):
+    if isinstance(value, time):
+        return value.strftime('%H:%M')
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(json.dumps({'id': last_id}).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded.encode()))['id'])
+    except (ValueError, KeyError, TypeError):
+        raise ApiError('Curseur invalide.')
+
+def keyset_page(resource, args, max_limit):
+    """One page ordered by id, resumed after the `cursor` id.
+
+    The page is read with `id > last ORDER BY id LIMIT n + 1`, so its cost
+    does not depend on how deep the cursor is; the extra row only tells
+    whether another page follows.
+    """
+    try:
+        limit = int(args.get('limit', 50))
+    except ValueError:
+        raise ApiError('Valeur invalide pour limit.')
+    limit = max(1, min(limit, max_limit))
+    columns, related = resource.parse_fields(args.get('fields'))
+
+    query = resource.apply_filters(resource.query(columns, related), args)
+    if args.get('cursor'):
+        query = query.filter(resource.model.id > decode_cursor(args['cursor']))
+    rows = query.order_by(resource.model.id).limit(limit + 1).all()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'data': [resource.serialize(row, columns, related) for row in rows],
+        'next_cursor': encode_cursor(rows[-1].id) if more else None,
+        'limit': limit
+    }
@@ -0,0 +1,159 @@
+# benchmark.py
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import event, func
+
+from core.extensions import db
+from core.identity import identity_cache
+from core.models import Schedule, User
+from patterns.conflicts import schedule_index
+from patterns.statistics import clear_statistics_cache
+from patterns.timetable_cache import timetable_cache
+
+# Config keys of the on-disk artifact caches, pointed at a scratch directory while benchmarking
+CACHE_DIR_KEYS = ('PDF_CACHE_DIR', 'CHART_CACHE_DIR', 'CALENDAR_CACHE_DIR')
+
+class QueryCounter:
+    """Count the statements sent to every engine of the app while active."""
+    def __init__(self, engines):
+        self.engines = list(engines)
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        for engine in self.engines:
+            event.listen(engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        for engine in self.engines:
+            event.remove(engine, 'before_cursor_execute', self._count)
+
+def _targets():
+    """Pick the busiest program/year, teacher and a student of that program, plus one stored schedule."""
+    program_id, year = db.session.query(Schedule.program_id, Schedule.year).group_by(
+        Schedule.program_id, Schedule.year
+    ).order_by(func.count(Schedule.id).desc()).first() or (None, None)
+    if program_id is None:
+        raise ValueError('Aucun créneau en base : lancez `flask seed-synthetic` d\'abord.')
+    teacher_id = db.session.query(Schedule.teacher_id).group_by(Schedule.teacher_id).order_by(
+        func.count(Schedule.id).desc()
+    ).limit(1).scalar()
+    teacher_user = User.query.filter(User.teacher.has(id=teacher_id)).first()
+    student = User.query.filter_by(role='student', program_id=program_id, year=year).first()
+    admin = User.query.filter_by(role='admin').first()
+    sample = Schedule.query.filter_by(program_id=program_id, year=year).first()
+    if student is None or admin is None:
+        raise ValueError('Il faut un administrateur et un étudiant de la filière la plus chargée.')
+    return {'program_id': program_id, 'year': year, 'admin': admin.id, 'teacher': teacher_user.id,
+            'student': student.id, 'sample': sample.id}
+
+def scenarios(targets):
+    """(name, user id or None, GET url or callable) for every measured operation."""
+    program = f"program_id={targets['program_id']}&year={targets['year']}"
+    return [
+        ('check_schedule_conflicts', None, 'conflicts'),
+        ('manage_schedule', targets['admin'], f'/admin/schedule?{program}'),
+        ('admin_dashboard', targets['admin'], '/admin/dashboard'),
+        ('teacher_dashboard', targets['teacher'], '/teacher/dashboard'),
+        ('student_dashboard', targets['student'], '/student/dashboard'),
+        ('admin_schedule_pdf', targets['admin'], f'/admin/export/schedule/pdf?{program}'),
+        ('teacher_schedule_pdf', targets['teacher'], '/teacher/export/schedule/pdf'),
+        ('student_schedule_pdf', targets['student'], '/student/export/schedule/pdf'),
+        ('teacher_chart', targets['admin'], '/admin/teacher_chart'),
+        ('teacher_chart_png', targets['admin'], '/admin/teacher_chart.png'),
+    ]
+
+def _reset_caches():
+    timetable_cache.clear()
+    identity_cache.clear()
+    clear_statistics_cache()
+    schedule_index.invalidate()
+
+def _conflict_check(app, sample_id):
+    from routes.admin import check_schedule_conflicts
+
+    sample = db.session.get(Schedule, sample_id)
+    args = (sample.room_id, sample.teacher_id, sample.group_id, sample.day, sample.start_time, sample.end_time)
+
+    def run():
+        with app.test_request_context():
+            check_schedule_conflicts(*args)
+    return run
+
+def _client_for(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
+
+def run_benchmarks(app, repeat=5):
+    """Time every scenario `repeat` times from cold caches.
+
+    The first run of each scenario is reported as cold and the median of
+    the others as warm, each with its number of SQL statements. The
+    artifact caches live in a scratch directory for the duration, so
+    cold PDF and chart timings include rendering.
+    """
+    saved = {key: app.config[key] for key in CACHE_DIR_KEYS}
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        for key in CACHE_DIR_KEYS:
+            app.config[key] = f'{scratch}/{key.lower()}'
+        try:
+            with app.app_context():
+                targets = _targets()
+                counter = QueryCounter(db.engines.values())
+                conflict_check = _conflict_check(app, targets['sample'])
+            _reset_caches()
+            for name, user_id, target in scenarios(targets):
+                client = _client_for(app, user_id) if user_id else None
+                timings, queries = [], []
+                for _run in range(max(repeat, 2)):
+                    with counter:
+                        start = time.perf_counter()
+                        # A fresh app context per run: under the CLI the requests would otherwise share the
+                        # command's context, and with it g (the logged-in user) and the database session
+                        with app.app_context():
+                            if client is None:
+                                conflict_check()
+                            else:
+                                response = client.get(target)
+                                response.get_data()
+                                if response.status_code != 200:
+                                    raise RuntimeError(f'{name}: HTTP {response.status_code} for {target}')
+                        timings.append((time.perf_counter() - start) * 1000)
+                    queries.append(counter.count)
+                results[name] = {
+                    'cold_ms': round(timings[0], 2),
+                    'warm_ms': round(statistics.median(timings[1:]), 2),
+                    'cold_queries': queries[0],
+                    'warm_queries': max(queries[1:])
+                }
+        finally:
+            app.config.update(saved)
+    return {'created_at': datetime.utcnow().isoformat(timespec='seconds'), 'repeat': repeat, 'results': results}
+
+def compare(report, baseline, tolerance=0.5, slack_ms=5.0):
+    """Regressions of `report` against `baseline`: warm latency above
+    baseline * (1 + tolerance) + slack_ms, or more queries than recorded."""
+    problems = []
+    for name, base in baseline.get('results', {}).items():
+        current = report['results'].get(name)
+        if current is None:
+            problems.append(f'{name}: not measured')
+            continue
+        limit = base['warm_ms'] * (1 + tolerance) + slack_ms
+        if current['warm_ms'] > limit:
+            problems.append(f"{name}: {current['warm_ms']} ms warm (baseline {base['warm_ms']} ms, limit {limit:.2f} ms)")
+        for key in ('cold_queries', 'warm_queries'):
+            if current[key] > base[key]:
+                problems.append(f'{name}: {current[key]} {key.replace("_", " ")} (baseline {base[key]})')
+    return problems
@@ -0,0 +1,120 @@
+# calendar_feed.py
+from datetime import date, datetime, timedelta
+
+from flask import Response, current_app, request, stream_with_context
+
+from core.cache import cache_key, data_state, file_cache
+from patterns.grid import DAYS
+from patterns.timetable_cache import TIMETABLE_SCOPES
+
+def semester_start():
+    """Monday the weekly events start from: SEMESTER_START, or the current week's Monday."""
+    configured = current_app.config.get('SEMESTER_START')
+    start = date.fromisoformat(configured) if configured else date.today()
+    return start - timedelta(days=start.weekday())
+
+def _escape(text):
+    return (str(text).replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+def _fold(line):
+    """Split a content line into 75-octet pieces as RFC 5545 requires."""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + '\r\n'
+    pieces = []
+    while data:
+        limit = 75 if not pieces else 74
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:  # never split a UTF-8 sequence
+            cut -= 1
+        pieces.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    return '\r\n '.join(pieces) + '\r\n'
+
+def _timestamp(value):
+    return value.strftime('%Y%m%dT%H%M%S')
+
+def ics_chunks(name, schedules, monday, weeks, stamp):
+    """Yield the calendar as UTF-8 chunks, one weekly recurring VEVENT per schedule."""
+    header = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Faculte//Emploi du temps//FR',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(name)}'
+    ]
+    yield ''.join(_fold(line) for line in header).encode('utf-8')
+
+    rule = f'RRULE:FREQ=WEEKLY;COUNT={weeks}' if weeks else 'RRULE:FREQ=WEEKLY'
+    for schedule in schedules:
+        if schedule.day not in DAYS:
+            continue
+        day = monday + timedelta(days=DAYS.index(schedule.day))
+        start = datetime.combine(day, schedule.start_time)
+        end = datetime.combine(day, schedule.end_time)
+        if end <= start:  # slot crossing midnight
+            end += timedelta(days=1)
+        description = [
+            f"Enseignant: {schedule.teacher.first_name} {schedule.teacher.last_name}",
+            f"Filière: {schedule.program.name}",
+            f"Groupe: {schedule.group.name if schedule.group else 'Tous'}"
+        ]
+        event = [
+            'BEGIN:VEVENT',
+            f'UID:schedule-{schedule.id}@emploi-du-temps',
+            f'DTSTAMP:{_timestamp(stamp)}Z',
+            f'DTSTART:{_timestamp(start)}',
+            f'DTEND:{_timestamp(end)}',
+            rule,
+            f'SUMMARY:{_escape(f"{schedule.course.name} ({schedule.course.type})")}',
+            f'LOCATION:{_escape(schedule.room.name)}',
+            f"DESCRIPTION:{_escape(chr(10).join(description))}",
+            'END:VEVENT'
+        ]
+        yield ''.join(_fold(line) for line in event).encode('utf-8')
+
+    yield _fold('END:VCALENDAR').encode('utf-8')
+
+def feed_response(kind, entity, name, load_schedules):
+    """Serve an .ics feed with a strong ETag.
+
+    The key covers (kind, entity, data versions of TIMETABLE_SCOPES, first
+    week), so polling clients get 304 while nothing changed. A feed is
+    streamed while it is generated, stored in the CALENDAR file cache,
+    and served from there until the data changes. `load_schedules` must
+    eager load program, course, teacher, group and room.
+    """
+    versions, last_modified = data_state(*TIMETABLE_SCOPES)
+    monday = semester_start()
+    weeks = current_app.config['SEMESTER_WEEKS'] if current_app.config.get('SEMESTER_START') else None
+    key = cache_key('ics', kind, entity, versions, monday.isoformat(), weeks)
+
+    headers = {
+        'Cache-Control': f"private, max-age={current_app.config['CALENDAR_FEED_MAX_AGE']}",
+        'Content-Disposition': 'inline; filename=emploi_du_temps.ics'
+    }
+    if key[:40] in request.if_none_match:
+        response = Response(status=304, headers=headers)
+    else:
+        cache = file_cache('CALENDAR')
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data, mimetype='text/calendar', headers=headers)
+        else:
+            schedules = load_schedules()
+            stamp = last_modified or datetime.utcnow()
+
+            def generate():
+                chunks = []
+                for chunk in ics_chunks(name, schedules, monday, weeks, stamp):
+                    chunks.append(chunk)
+                    yield chunk
+                cache.set(key, b''.join(chunks))
+
+            response = Response(stream_with_context(generate()), mimetype='text/calendar', headers=headers)
+    response.set_etag(key[:40])
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return response
@@ -0,0 +1,32 @@
+# chart_render.py
+# Imported lazily by the chart route: matplotlib is only loaded by the
+# workers that actually render an image.
+from io import BytesIO
+
+from matplotlib.figure import Figure
+
+def render_teacher_chart(labels, hours, image_format='png'):
+    """Render the teacher hours bar chart to PNG or SVG bytes."""
+    # Figure is used directly (no pyplot) so renders share no global state
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    x = list(range(len(labels)))
+    bars = ax.bar(x, hours, color='#1e88e5', edgecolor='black')
+
+    ax.set_xlabel('Enseignants', fontsize=12)
+    ax.set_ylabel('Heures', fontsize=12)
+    ax.set_title('Heures par Enseignant', fontsize=14)
+    ax.set_xticks(x)
+    ax.set_xticklabels(labels, rotation=45, ha='right', fontsize=10)
+    ax.grid(True, axis='y', linestyle='--', alpha=0.7)
+
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height,
+                f'{height:.2f}h',
+                ha='center', va='bottom', fontsize=9)
+
+    fig.tight_layout()
+    buf = BytesIO()
+    fig.savefig(buf, format=image_format, dpi=100)
+    return buf.getvalue()
@@ -0,0 +1,240 @@
+# conflicts.py
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict, namedtuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from core.cache import on_versions_bumped
+from core.extensions import db
+from core.models import DataVersion, Schedule
+
+Slot = namedtuple('Slot', ['start', 'end', 'id'])
+
+def to_minutes(value):
+    """Convert a time object (or 'HH:MM' string) to minutes since midnight."""
+    if isinstance(value, str):
+        hours, minutes = value.split(':')[:2]
+        return int(hours) * 60 + int(minutes)
+    return value.hour * 60 + value.minute
+
+def _as_id(value):
+    """Normalize form values ('3', 3, '', None) to an int id or None."""
+    if value in (None, '', 'all'):
+        return None
+    return int(value)
+
+class IntervalBucket:
+    """Intervals of one (day, resource) key, sorted by start.
+
+    A proposed slot [start, end) can only overlap entries whose start is
+    before `end`; walking left from that position stops as soon as an entry
+    starts earlier than `start - longest`, so a lookup costs O(log n + k).
+    """
+    def __init__(self):
+        self.slots = []
+        self.longest = 0
+
+    def add(self, slot):
+        insort(self.slots, slot)
+        self.longest = max(self.longest, slot.end - slot.start)
+
+    def remove(self, slot):
+        idx = bisect_left(self.slots, slot)
+        if idx < len(self.slots) and self.slots[idx] == slot:
+            del self.slots[idx]
+        if not self.slots:
+            self.longest = 0
+
+    def overlapping(self, start, end):
+        idx = bisect_left(self.slots, (end,))
+        found = []
+        while idx > 0:
+            idx -= 1
+            slot = self.slots[idx]
+            if slot.start + self.longest <= start:
+                break
+            if slot.end > start:
+                found.append(slot.id)
+        return found
+
+class ScheduleIndex:
+    """In-memory interval index over Schedule rows.
+
+    Rows are bucketed by (day, room_id), (day, teacher_id) and
+    (day, group_id). The index remembers the DataVersion('schedule') counter
+    it was built at; a lookup reads the counter (one primary-key read) and
+    rebuilds the index when it has moved, so writes committed by other
+    worker processes are seen by the next lookup. This process's own
+    commits are applied in place when they are the only bump since.
+    """
+    KINDS = ('room', 'teacher', 'group')
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._buckets = None
+        self._rows = {}
+        self._version = None
+
+    def invalidate(self):
+        """Drop the index; it is rebuilt on the next lookup."""
+        with self._lock:
+            self._buckets = None
+            self._rows = {}
+            self._version = None
+
+    def _ensure_built(self):
+        if self._buckets is not None:
+            # From the primary, like the rebuild: a lagging replica would never match
+            stored = db.session.execute(
+                select(DataVersion.version).where(DataVersion.scope == 'schedule'),
+                bind_arguments={'bind': db.engine}
+            ).scalar() or 0
+            if stored == self._version:
+                return
+        # Counter and rows from one transaction of their own, so they match each other and
+        # the session's uncommitted changes never get into the index
+        with db.engine.connect() as connection:
+            version = connection.execute(
+                select(DataVersion.version).where(DataVersion.scope == 'schedule')
+            ).scalar() or 0
+            rows = connection.execute(select(
+                Schedule.id, Schedule.day, Schedule.start_time, Schedule.end_time,
+                Schedule.room_id, Schedule.teacher_id, Schedule.group_id
+            )).all()
+        self._buckets = {kind: {} for kind in self.KINDS}
+        self._rows = {}
+        for row in rows:
+            self._insert(*row)
+        self._version = version
+
+    def _keys(self, day, room_id, teacher_id, group_id):
+        keys = [('room', (day, room_id)), ('teacher', (day, teacher_id))]
+        if group_id is not None:
+            keys.append(('group', (day, group_id)))
+        return keys
+
+    def _insert(self, schedule_id, day, start_time, end_time, room_id, teacher_id, group_id):
+        room_id, teacher_id, group_id = _as_id(room_id), _as_id(teacher_id), _as_id(group_id)
+        slot = Slot(to_minutes(start_time), to_minutes(end_time), schedule_id)
+        keys = self._keys(day, room_id, teacher_id, group_id)
+        for kind, key in keys:
+            self._buckets[kind].setdefault(key, IntervalBucket()).add(slot)
+        self._rows[schedule_id] = (slot, keys)
+
+    def _discard(self, schedule_id):
+        entry = self._rows.pop(schedule_id, None)
+        if entry is None:
+            return
+        slot, keys = entry
+        for kind, key in keys:
+            bucket = self._buckets[kind].get(key)
+            if bucket is not None:
+                bucket.remove(slot)
+                if not bucket.slots:
+                    del self._buckets[kind][key]
+
+    def apply(self, upserts, deletes, version=None):
+        """Apply committed changes: `upserts` are row tuples, `deletes` ids.
+
+        `version` is the schedule counter after the commit (None when it
+        did not move). If other commits bumped it in between, the index is
+        dropped instead and rebuilt on the next lookup.
+        """
+        with self._lock:
+            if self._buckets is None:
+                return
+            if version is not None:
+                if version != self._version + 1:
+                    self.invalidate()
+                    return
+                self._version = version
+            for schedule_id in deletes:
+                self._discard(schedule_id)
+            for row in upserts:
+                self._discard(row[0])
+                self._insert(*row)
+
+    def find(self, room_id, teacher_id, group_id, day, start_time, end_time, exclude_id=None):
+        """Return {'room': [ids], 'teacher': [ids], 'group': [ids]} of overlapping rows."""
+        start, end = to_minutes(start_time), to_minutes(end_time)
+        group_id = _as_id(group_id)
+        result = {kind: [] for kind in self.KINDS}
+        with self._lock:
+            self._ensure_built()
+            for kind, key in self._keys(day, _as_id(room_id), _as_id(teacher_id), group_id):
+                bucket = self._buckets[kind].get(key)
+                if bucket is not None:
+                    result[kind] = sorted(i for i in bucket.overlapping(start, end) if i != exclude_id)
+        return result
+
+schedule_index = ScheduleIndex()
+
+def overlaps(start_time, end_time):
+    """SQL predicate for rows overlapping [start_time, end_time).
+
+    A bounded range on start_time plus a filter on end_time, so the
+    (day, resource, start_time) indexes on Schedule can serve it.
+    """
+    return db.and_(Schedule.start_time < end_time, Schedule.end_time > start_time)
+
+def find_conflicting_pairs(schedules):
+    """Sort-and-sweep conflict detection over already loaded schedules.
+
+    Schedules are grouped per (day, room), (day, teacher) and (day, group),
+    sorted by start time and swept once while keeping the still-running
+    entries in a heap ordered by end time. Returns a list of
+    (kind, schedule_a, schedule_b) tuples, each overlapping pair once.
+    """
+    groups = defaultdict(list)
+    for schedule in schedules:
+        start, end = to_minutes(schedule.start_time), to_minutes(schedule.end_time)
+        groups[('room', schedule.day, _as_id(schedule.room_id))].append((start, end, schedule))
+        groups[('teacher', schedule.day, _as_id(schedule.teacher_id))].append((start, end, schedule))
+        if schedule.group_id is not None:
+            groups[('group', schedule.day, _as_id(schedule.group_id))].append((start, end, schedule))
+
+    pairs = []
+    for (kind, _day, _key), entries in groups.items():
+        if len(entries) < 2:
+            continue
+        entries.sort(key=lambda entry: (entry[0], entry[1], entry[2].id))
+        active = []
+        for start, end, schedule in entries:
+            while active and active[0][0] <= start:
+                heapq.heappop(active)
+            for _end, _id, other in active:
+                pairs.append((kind, other, schedule))
+            heapq.heappush(active, (end, schedule.id, schedule))
+    return pairs
+
+def _schedule_row(schedule):
+    return (schedule.id, schedule.day, schedule.start_time, schedule.end_time,
+            schedule.room_id, schedule.teacher_id, schedule.group_id)
+
+@event.listens_for(Session, 'after_flush')
+def _collect_schedule_changes(session, flush_context):
+    pending = session.info.setdefault('schedule_index', {'upserts': {}, 'deletes': set()})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Schedule):
+            pending['upserts'][obj.id] = _schedule_row(obj)
+            pending['deletes'].discard(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Schedule):
+            pending['upserts'].pop(obj.id, None)
+            pending['deletes'].add(obj.id)
+
+@on_versions_bumped
+def _apply_schedule_changes(session, versions):
+    pending = session.info.pop('schedule_index', None)
+    if pending:
+        if versions is None:
+            schedule_index.invalidate()
+        else:
+            schedule_index.apply(pending['upserts'].values(), pending['deletes'], versions.get('schedule'))
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_schedule_changes(session):
+    session.info.pop('schedule_index', None)
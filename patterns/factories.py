@@ -1,13 +1,18 @@
 # factories.py
-from core.models import User, Teacher
+from core.models import User, Teacher, StudentGroup
 from core.extensions import db
 
 class UserFactory:
     """Factory for creating User and related objects based on role."""
     @staticmethod
-    def create_user(username, email, password, role, program_id=None, year=None, first_name=None, last_name=None, teacher_type=None, max_hours=20):
+    def create_user(username, email, password, role, program_id=None, year=None, first_name=None, last_name=None, teacher_type=None, max_hours=20, group_id=None):
         """Create a user and associated objects based on role."""
-        user = User(username=username, email=email, role=role, program_id=program_id, year=year)
+        group_id = group_id if role == 'student' and group_id else None
+        if group_id:
+            group = db.session.get(StudentGroup, int(group_id))
+            if group is None or str(group.program_id) != str(program_id):
+                raise ValueError("Le groupe choisi n'appartient pas à cette filière.")
+        user = User(username=username, email=email, role=role, program_id=program_id, year=year, group_id=group_id)
         user.set_password(password)
         db.session.add(user)
         db.session.flush()  # Get user.id without committing
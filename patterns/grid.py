@@ -0,0 +1,60 @@
+# grid.py
+from bisect import bisect_left, bisect_right
+
+from patterns.conflicts import to_minutes
+
+DAYS = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi"]
+TIME_SLOTS = [
+    ('08:30', '10:30'),
+    ('10:40', '12:40'),
+    ('13:00', '15:00'),
+    ('15:10', '17:10'),
+    ('17:20', '19:20')
+]
+# Slot bounds in minutes since midnight; both lists are sorted since slots do not overlap
+SLOT_STARTS = [to_minutes(start) for start, _end in TIME_SLOTS]
+SLOT_ENDS = [to_minutes(end) for _start, end in TIME_SLOTS]
+
+def slot_range(start_time, end_time):
+    """Indexes of the TIME_SLOTS overlapping [start_time, end_time), by binary search."""
+    start, end = to_minutes(start_time), to_minutes(end_time)
+    return range(bisect_right(SLOT_ENDS, start), bisect_left(SLOT_STARTS, end))
+
+class TimetableGrid:
+    """Schedules placed into the DAYS x TIME_SLOTS cells they overlap.
+
+    Built in one pass: each schedule's times are converted to minutes once
+    and its slots found by binary search. `grid[day][slot]` lists the
+    schedules of a cell by start time, which is what the templates index.
+    """
+    def __init__(self, schedules):
+        self.cells = {day: [[] for _slot in TIME_SLOTS] for day in DAYS}
+        self.total_minutes = 0
+        placed = []
+        for schedule in schedules:
+            start, end = to_minutes(schedule.start_time), to_minutes(schedule.end_time)
+            self.total_minutes += end - start if end >= start else end - start + 24 * 60
+            placed.append((start, end, schedule.id or 0, schedule))
+        placed.sort(key=lambda entry: entry[:3])
+        for start, end, _id, schedule in placed:
+            row = self.cells.get(schedule.day)
+            if row is None:
+                continue
+            for slot in range(bisect_right(SLOT_ENDS, start), bisect_left(SLOT_STARTS, end)):
+                row[slot].append(schedule)
+
+    def __getitem__(self, day):
+        return self.cells[day]
+
+    @property
+    def total_hours(self):
+        return self.total_minutes / 60
+
+    def first_per_cell(self, describe):
+        """{(day, slot): describe(first schedule)} for every non-empty cell."""
+        return {
+            (day, slot): describe(entries[0])
+            for day, row in self.cells.items()
+            for slot, entries in enumerate(row)
+            if entries
+        }
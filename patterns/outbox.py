@@ -0,0 +1,169 @@
+# outbox.py
+import secrets
+import smtplib
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import event, func, insert
+from sqlalchemy.orm import Session
+
+from core.extensions import db, mail
+from core.models import OutboxMessage
+
+# Set when a commit queued a message, so the worker thread sends it without waiting for its next poll
+_wakeup = threading.Event()
+
+def queue_email(subject, recipients, body):
+    """Add an email to the outbox in the caller's transaction; it is sent after the commit."""
+    message = OutboxMessage(subject=subject, recipients=','.join(recipients), body=body)
+    db.session.add(message)
+    db.session.info['outbox_queued'] = True
+    return message
+
+def queue_emails(messages):
+    """Bulk version of queue_email for (subject, recipients, body) tuples: one INSERT for the lot."""
+    if not messages:
+        return
+    db.session.execute(insert(OutboxMessage), [
+        {'subject': subject, 'recipients': ','.join(recipients), 'body': body}
+        for subject, recipients, body in messages
+    ])
+    db.session.info['outbox_queued'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _wake_worker(session):
+    if session.info.pop('outbox_queued', False):
+        _wakeup.set()
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_queued(session):
+    session.info.pop('outbox_queued', None)
+
+def _retry_delay(attempts, config):
+    return min(config['OUTBOX_RETRY_DELAY'] * 2 ** (attempts - 1), config['OUTBOX_RETRY_MAX_DELAY'])
+
+def _claim_batch(now, config):
+    """Reserve up to OUTBOX_BATCH_SIZE due messages for this worker.
+
+    Messages still 'sending' after their lease (a worker that died mid
+    batch) are due again. The conditional UPDATE lets only one worker
+    claim a given message.
+    """
+    token = secrets.token_hex(16)
+    due = db.session.query(OutboxMessage.id).filter(
+        OutboxMessage.status.in_(('pending', 'sending')),
+        OutboxMessage.next_attempt_at <= now
+    ).order_by(OutboxMessage.id).limit(config['OUTBOX_BATCH_SIZE']).all()
+    if not due:
+        return []
+    db.session.query(OutboxMessage).filter(
+        OutboxMessage.id.in_([row.id for row in due]),
+        OutboxMessage.status.in_(('pending', 'sending')),
+        OutboxMessage.next_attempt_at <= now
+    ).update({
+        'status': 'sending',
+        'claimed_by': token,
+        'next_attempt_at': now + timedelta(seconds=config['OUTBOX_LEASE_SECONDS'])
+    }, synchronize_session=False)
+    db.session.commit()
+    return OutboxMessage.query.filter_by(claimed_by=token, status='sending').order_by(OutboxMessage.id).all()
+
+def _record_failure(message, error, now, config):
+    message.attempts += 1
+    message.last_error = str(error)[:1000]
+    message.claimed_by = None
+    if message.attempts >= config['OUTBOX_MAX_ATTEMPTS']:
+        message.status = 'failed'
+    else:
+        message.status = 'pending'
+        message.next_attempt_at = now + timedelta(seconds=_retry_delay(message.attempts, config))
+
+def deliver_pending():
+    """Send one batch of due messages over a single SMTP connection; return the number claimed.
+
+    A message the server refuses is retried with exponential backoff and
+    marked 'failed' after OUTBOX_MAX_ATTEMPTS. When the connection itself
+    fails, the message being sent counts a failed attempt and the rest of
+    the batch waits OUTBOX_RETRY_DELAY without losing one.
+    """
+    config = current_app.config
+    batch = _claim_batch(datetime.utcnow(), config)
+    if not batch:
+        return 0
+
+    sender = config['MAIL_DEFAULT_SENDER']
+    remaining = list(batch)
+    try:
+        with mail.connect() as connection:
+            while remaining:
+                message = remaining[0]
+                try:
+                    connection.send(Message(subject=message.subject, recipients=message.recipients.split(','),
+                                            body=message.body, sender=sender))
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                    _record_failure(message, e, datetime.utcnow(), config)
+                except OSError:
+                    raise  # the connection is gone (SMTPException is an OSError too)
+                except Exception as e:  # malformed message
+                    _record_failure(message, e, datetime.utcnow(), config)
+                else:
+                    message.status = 'sent'
+                    message.sent_at = datetime.utcnow()
+                    message.body = ''
+                    message.claimed_by = None
+                remaining.pop(0)
+                db.session.commit()
+    except OSError as e:
+        current_app.logger.warning(f"Outbox: SMTP connection failed: {e}")
+        now = datetime.utcnow()
+        if remaining:
+            _record_failure(remaining[0], e, now, config)
+            for message in remaining[1:]:
+                message.status = 'pending'
+                message.claimed_by = None
+                message.next_attempt_at = now + timedelta(seconds=config['OUTBOX_RETRY_DELAY'])
+        db.session.commit()
+    return len(batch)
+
+def outbox_counts():
+    """Number of outbox messages per status."""
+    return dict(db.session.query(OutboxMessage.status, func.count(OutboxMessage.id)).group_by(OutboxMessage.status))
+
+def run_outbox(app, stop=None):
+    """Send due messages until `stop` is set, waking on new commits or every OUTBOX_POLL_INTERVAL seconds."""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        with app.app_context():
+            try:
+                while deliver_pending() >= app.config['OUTBOX_BATCH_SIZE']:
+                    pass
+            except Exception:
+                app.logger.exception('Outbox: delivery round failed')
+                db.session.rollback()
+            finally:
+                db.session.remove()
+        _wakeup.wait(app.config['OUTBOX_POLL_INTERVAL'])
+        _wakeup.clear()
+
+_worker_lock = threading.Lock()
+_worker = None
+
+def start_outbox_worker(app):
+    """Start the background sending thread once per process."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=run_outbox, args=(app,), name='outbox', daemon=True)
+            _worker.start()
+
+def init_outbox(app):
+    """Start the worker thread with the first request (not for CLI commands) when OUTBOX_WORKER_THREAD is set."""
+    if not app.config['OUTBOX_WORKER_THREAD']:
+        return
+
+    @app.before_request
+    def _ensure_outbox_worker():
+        if _worker is None or not _worker.is_alive():
+            start_outbox_worker(app)
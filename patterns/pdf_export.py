@@ -0,0 +1,217 @@
+# pdf_export.py
+import os
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.utils import secure_filename
+
+from core.cache import cache_key, cached_artifact_response, current_versions, file_cache
+from core.metrics import RENDER_SECONDS
+from core.utils import process_context
+from patterns.grid import TimetableGrid
+
+# Tables whose content appears in a timetable PDF
+PDF_SCOPES = ('schedule', 'course', 'room', 'teacher', 'program', 'student_group')
+
+def year_label(year):
+    return f"{year}ère année" if str(year) == '1' else f"{year}ème année"
+
+def program_filename(program, year):
+    return f'emploi_du_temps_{program.name}_{year_label(year)}.pdf'
+
+def teacher_filename(teacher):
+    return f'emploi_du_temps_{teacher.last_name}.pdf'
+
+def group_filename():
+    return 'emploi_du_temps.pdf'
+
+def program_document(program, year, schedules):
+    """Plain-data description of a program/year timetable PDF."""
+    year_text = year_label(year)
+    grid = TimetableGrid(schedules)
+    return {
+        'layout': 'program',
+        'filename': program_filename(program, year),
+        'info': [],
+        'title': f"<b>Emploi du Temps - {program.name} ({year_text})</b>",
+        'cells': grid.first_per_cell(lambda s: [
+            f"<b>{s.course.name}</b> ({s.course.type})",
+            f"Pr. {s.teacher.last_name}",
+            f"Groupe: {s.group.name if s.group else 'Tous'}",
+            f"Salle: {s.room.name}"
+        ]),
+        'footer': None
+    }
+
+def teacher_document(teacher, schedules):
+    """Plain-data description of a teacher timetable PDF."""
+    grid = TimetableGrid(schedules)
+    # The maintained weekly load (patterns.teacher_load) is authoritative when present
+    hours = teacher.load.minutes / 60 if teacher.load is not None else grid.total_hours
+    return {
+        'layout': 'personal',
+        'filename': teacher_filename(teacher),
+        'info': [
+            f"Enseignant: {teacher.first_name} {teacher.last_name}",
+            f"Type: {teacher.type}",
+            f"Heures max/semaine: {teacher.max_hours}"
+        ],
+        'title': f"<b>Emploi du Temps - {teacher.first_name} {teacher.last_name}</b>",
+        'cells': grid.first_per_cell(lambda s: [
+            f"<b>{s.course.name}</b> ({s.course.type})",
+            f"Filière: {s.program.name}",
+            f"Groupe: {s.group.name if s.group else 'Tous'}",
+            f"Salle: {s.room.name}"
+        ]),
+        'footer': f"<b>Total heures/semaine: {hours:.1f}h</b>"
+    }
+
+def group_document(program, year, group, schedules):
+    """Plain-data description of a student group timetable PDF."""
+    year_text = year_label(year)
+    grid = TimetableGrid(schedules)
+    return {
+        'layout': 'personal',
+        'filename': group_filename(),
+        'info': [
+            f"Filière: {program.name}",
+            f"Année: {year_text}",
+            f"Groupe: {group.name if group else 'Non assigné'}"
+        ],
+        'title': f"<b>Emploi du Temps - {program.name} ({year_text})</b>",
+        'cells': grid.first_per_cell(lambda s: [
+            f"<b>{s.course.name}</b> ({s.course.type})",
+            f"Pr. {s.teacher.last_name}",
+            f"Groupe: {s.group.name if s.group else 'Tous'}",
+            f"Salle: {s.room.name}"
+        ]),
+        'footer': f"<b>Total heures/semaine: {grid.total_hours:.1f}h</b>"
+    }
+
+def pdf_response(kind, entity, filename, build_document):
+    """Serve a timetable PDF from the artifact cache, rendering it on a miss.
+
+    The cache key is (kind, entity, data versions of PDF_SCOPES), so any
+    committed change to those tables yields a new key and a new ETag.
+    `build_document` is only called on a miss.
+    """
+    key = cache_key('pdf', kind, entity, current_versions(*PDF_SCOPES))
+
+    def build():
+        # reportlab is only imported once a PDF actually has to be drawn
+        from patterns.pdf_render import render_pdf
+        with RENDER_SECONDS.labels('pdf').time():
+            return render_pdf(build_document())
+
+    return cached_artifact_response(
+        file_cache('PDF'), key, 'application/pdf', build,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+def faculty_documents(schedules, teachers, groups):
+    """Build every program/year, teacher and group document from preloaded rows.
+
+    `schedules` must be eager loaded with program, course, teacher, group and
+    room so that no query is issued while the documents are assembled.
+    Returns a list of (archive path, document).
+    """
+    by_program_year = {}
+    by_teacher = {}
+    for schedule in schedules:
+        by_program_year.setdefault((schedule.program_id, int(schedule.year)), []).append(schedule)
+        by_teacher.setdefault(schedule.teacher_id, []).append(schedule)
+
+    documents = []
+    for (program_id, year), rows in sorted(by_program_year.items()):
+        program = rows[0].program
+        name = secure_filename(f"{program.name}_{year}") or str(program_id)
+        documents.append((f"filieres/{name}.pdf", program_document(program, year, rows)))
+        for group in groups:
+            if group.program_id != program_id:
+                continue
+            group_rows = [s for s in rows if s.group_id is None or s.group_id == group.id]
+            name = secure_filename(f"{program.name}_{year}_{group.name}") or str(group.id)
+            documents.append((f"groupes/{name}.pdf", group_document(program, year, group, group_rows)))
+
+    for teacher in teachers:
+        name = secure_filename(f"{teacher.last_name}_{teacher.first_name}_{teacher.id}") or str(teacher.id)
+        documents.append((f"enseignants/{name}.pdf", teacher_document(teacher, by_teacher.get(teacher.id, []))))
+    return documents
+
+class _ZipBuffer:
+    """Write-only file object whose content is drained after each archive entry."""
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+def _pdf_pool(workers):
+    """Render process pool shared by the bundle exports of this process, started on first use."""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, mp_context=process_context())
+        return _render_pool
+
+def _discard_pool(pool):
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is pool:
+            _render_pool = None
+
+def stream_pdf_bundle(documents, workers=None):
+    """Render documents on the shared process pool and yield a ZIP archive in chunks.
+
+    Only a couple of documents per worker are queued ahead of the archive;
+    when the client goes away (GeneratorExit at a yield) the ones not
+    started yet are cancelled instead of being rendered for nobody.
+    """
+    from patterns.pdf_render import render_pdf
+
+    pool = _pdf_pool(workers)
+    remaining = iter(documents)
+    pending = deque()
+
+    def submit_next():
+        entry = next(remaining, None)
+        if entry is not None:
+            pending.append((entry[0], pool.submit(render_pdf, entry[1])))
+
+    buffer = _ZipBuffer()
+    try:
+        for _ in range(2 * (workers or os.cpu_count() or 1)):
+            submit_next()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            while pending:
+                path, future = pending.popleft()
+                submit_next()
+                archive.writestr(path, future.result())
+                yield buffer.drain()
+        yield buffer.drain()
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+    finally:
+        for _path, future in pending:
+            future.cancel()
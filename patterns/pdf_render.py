@@ -0,0 +1,76 @@
+# pdf_render.py
+# Imported lazily by patterns.pdf_export: loading reportlab is only paid by
+# the workers that actually draw a PDF.
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import letter, landscape
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+from patterns.grid import DAYS, TIME_SLOTS
+
+def render_pdf(document):
+    """Render a document built by one of the *_document helpers to PDF bytes."""
+    program_layout = document['layout'] == 'program'
+    margin = 72 if program_layout else 36
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=landscape(letter),
+        leftMargin=margin,
+        rightMargin=margin,
+        topMargin=36,
+        bottomMargin=36
+    )
+    elements = []
+    styles = getSampleStyleSheet()
+    if program_layout:
+        styles['Title'].alignment = TA_CENTER
+        styles['Heading1'].alignment = TA_CENTER
+        cell_style = styles['Normal'].clone('CellStyle')
+        cell_style.fontSize = 8
+        cell_style.leading = 10
+        cell_style.alignment = TA_CENTER
+    else:
+        cell_style = styles['Normal']
+
+    for info in document['info']:
+        elements.append(Paragraph(info, styles['Normal']))
+    if document['info']:
+        elements.append(Spacer(1, 12))
+
+    elements.append(Paragraph(document['title'], styles['Title']))
+    elements.append(Spacer(1, 12))
+
+    data = [["Jour/Horaire"] + [f"{start}-{end}" for start, end in TIME_SLOTS]]
+    for day in DAYS:
+        row = [day]
+        for slot_idx in range(len(TIME_SLOTS)):
+            lines = document['cells'].get((day, slot_idx))
+            row.append(Paragraph("<br/>".join(lines), cell_style) if lines else "")
+        data.append(row)
+
+    table = Table(data, colWidths=[100 if program_layout else 80] + [120] * len(TIME_SLOTS), repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3B82F6')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ]))
+    elements.append(table)
+
+    if program_layout:
+        elements.append(Spacer(1, 12))
+    if document['footer']:
+        elements.append(Spacer(1, 12))
+        elements.append(Paragraph(document['footer'], styles['Normal']))
+
+    doc.build(elements)
+    return buffer.getvalue()
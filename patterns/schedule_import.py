@@ -0,0 +1,209 @@
+# schedule_import.py
+import os
+
+import pandas as pd
+from sqlalchemy import insert
+
+from core.cache import bump_versions
+from core.extensions import db
+from core.models import Course, Program, Room, Schedule, StudentGroup, Teacher
+from patterns.conflicts import schedule_index
+from patterns.teacher_load import apply_load_changes, slot_minutes, teacher_loads
+from patterns.grid import DAYS
+
+COLUMNS = ['program_id', 'year', 'course_id', 'teacher_id', 'group_id', 'room_id', 'day', 'start_time', 'end_time']
+REQUIRED = ['program_id', 'year', 'course_id', 'teacher_id', 'room_id', 'day', 'start_time', 'end_time']
+REFERENCES = {
+    'program_id': Program,
+    'course_id': Course,
+    'teacher_id': Teacher,
+    'room_id': Room,
+    'group_id': StudentGroup
+}
+
+class ImportReport:
+    """Result of a bulk import: inserted count and every problem found."""
+    def __init__(self, total, errors, inserted=0):
+        self.total = total
+        self.errors = errors
+        self.inserted = inserted
+
+    @property
+    def rejected_rows(self):
+        return sorted({error['row'] for error in self.errors})
+
+    def to_dict(self):
+        return {
+            'status': 'success' if not self.errors else 'error',
+            'total': self.total,
+            'inserted': self.inserted,
+            'rejected': len(self.rejected_rows),
+            'errors': self.errors
+        }
+
+def read_schedule_file(stream, filename):
+    """Load a CSV, JSON or XLSX file into a DataFrame with the expected columns."""
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension == '.csv':
+        frame = pd.read_csv(stream, dtype=str, keep_default_na=False)
+    elif extension == '.json':
+        frame = pd.read_json(stream, orient='records', dtype=False)
+    elif extension in ('.xlsx', '.xls'):
+        frame = pd.read_excel(stream, dtype=str, keep_default_na=False)
+    else:
+        raise ValueError('Format non supporté (CSV, JSON ou XLSX attendu).')
+    frame.columns = [str(column).strip().lower() for column in frame.columns]
+    missing = [column for column in REQUIRED if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes : {', '.join(missing)}")
+    if 'group_id' not in frame.columns:
+        frame['group_id'] = None
+    return frame[COLUMNS].reset_index(drop=True)
+
+def _error(errors, rows, message, field=None):
+    for row in rows:
+        errors.append({'row': int(row) + 1, 'field': field, 'message': message})
+
+def validate_schedules(frame):
+    """Validate a whole batch in one pass.
+
+    Returns (clean, errors): `clean` holds typed values for every row,
+    `errors` lists each problem with its 1-based row number. Conflicts are
+    searched for within the batch and against every stored schedule using a
+    self-join per (day, resource), so no per-row query is made.
+    """
+    errors = []
+    clean = pd.DataFrame(index=frame.index)
+
+    for column in ('program_id', 'year', 'course_id', 'teacher_id', 'room_id', 'group_id'):
+        raw = frame[column].replace({'': None, 'all': None})
+        values = pd.to_numeric(raw, errors='coerce')
+        bad = raw.notna() & (values.isna() | (values % 1 != 0))
+        if column in REQUIRED:
+            bad |= raw.isna()
+        _error(errors, frame.index[bad], 'Valeur entière attendue.', column)
+        clean[column] = values.where(~bad).astype('Int64')
+
+    clean['day'] = frame['day'].astype(str).str.strip()
+    bad_day = ~clean['day'].isin(DAYS)
+    _error(errors, frame.index[bad_day], f"Jour invalide (attendu : {', '.join(DAYS)}).", 'day')
+
+    for column in ('start_time', 'end_time'):
+        parsed = pd.to_datetime(frame[column].astype(str).str.strip().str[:5], format='%H:%M', errors='coerce')
+        _error(errors, frame.index[parsed.isna()], 'Format de temps invalide. Utilisez HH:MM.', column)
+        clean[column] = parsed.dt.time
+        clean[column.replace('_time', '_min')] = parsed.dt.hour * 60 + parsed.dt.minute
+    bad_order = clean['start_min'].notna() & clean['end_min'].notna() & (clean['start_min'] >= clean['end_min'])
+    _error(errors, frame.index[bad_order], "L'heure de fin doit être après l'heure de début.", 'end_time')
+
+    # Foreign keys: one id query per referenced table
+    for column, model in REFERENCES.items():
+        values = clean[column].dropna()
+        if values.empty:
+            continue
+        known = {row[0] for row in db.session.query(model.id).filter(model.id.in_(values.unique().tolist()))}
+        unknown = values[~values.isin(known)]
+        _error(errors, unknown.index, f'Référence inconnue : {column}.', column)
+
+    usable = clean.drop(index=sorted({error['row'] - 1 for error in errors}))
+    errors.extend(_find_conflicts(usable))
+    usable = clean.drop(index=sorted({error['row'] - 1 for error in errors}))
+    errors.extend(_find_overloads(usable))
+    errors.sort(key=lambda error: (error['row'], error['field'] or ''))
+    return clean, errors
+
+def _find_conflicts(batch):
+    if batch.empty:
+        return []
+    existing = pd.DataFrame(db.session.query(
+        Schedule.id, Schedule.day, Schedule.start_time, Schedule.end_time,
+        Schedule.room_id, Schedule.teacher_id, Schedule.group_id
+    ).filter(Schedule.day.in_(batch['day'].unique().tolist())).all(),
+        columns=['ref', 'day', 'start_time', 'end_time', 'room_id', 'teacher_id', 'group_id'])
+    existing['start_min'] = [t.hour * 60 + t.minute for t in existing['start_time']]
+    existing['end_min'] = [t.hour * 60 + t.minute for t in existing['end_time']]
+    existing['batch'] = False
+
+    rows = batch[['day', 'start_min', 'end_min', 'room_id', 'teacher_id', 'group_id']].copy()
+    rows['ref'] = rows.index
+    rows['batch'] = True
+    combined = pd.concat([rows, existing.drop(columns=['start_time', 'end_time'])], ignore_index=True)
+    combined['pos'] = combined.index
+
+    labels = {'room_id': 'Conflit de salle', 'teacher_id': 'Enseignant occupé', 'group_id': 'Groupe occupé'}
+    errors = []
+    for column, label in labels.items():
+        part = combined[combined[column].notna()][['pos', 'day', column, 'start_min', 'end_min', 'ref', 'batch']]
+        pairs = part.merge(part, on=['day', column], suffixes=('', '_other'))
+        pairs = pairs[
+            (pairs['pos'] != pairs['pos_other'])
+            & pairs['batch']
+            & (pairs['start_min'] < pairs['end_min_other'])
+            & (pairs['end_min'] > pairs['start_min_other'])
+        ]
+        for pair in pairs.itertuples(index=False):
+            other = f"ligne {int(pair.ref_other) + 1}" if pair.batch_other else f"créneau existant #{int(pair.ref_other)}"
+            errors.append({'row': int(pair.ref) + 1, 'field': column, 'message': f'{label} avec {other}.'})
+    return errors
+
+def _find_overloads(batch):
+    """Rows that would take their teacher above max_hours, in file order."""
+    if batch.empty:
+        return []
+    minutes = (batch['end_min'] - batch['start_min']).astype(int)
+    loads = teacher_loads(db.session.connection(), [int(t) for t in batch['teacher_id'].unique()])
+    running = {teacher_id: load[1] for teacher_id, load in loads.items()}
+    errors = []
+    for row, teacher_id, duration in zip(batch.index, batch['teacher_id'], minutes):
+        name, _minutes, max_hours, _stored = loads[int(teacher_id)]
+        total = running[int(teacher_id)] + duration
+        if max_hours is not None and total > max_hours * 60:
+            errors.append({'row': int(row) + 1, 'field': 'teacher_id',
+                           'message': f'Heures max dépassées pour {name} ({total / 60:.1f}h / {max_hours}h).'})
+        else:
+            running[int(teacher_id)] = total
+    return errors
+
+def import_schedules(frame, strict=False, dry_run=False):
+    """Validate `frame` and bulk insert the valid rows in one transaction.
+
+    With `strict`, any error rejects the whole batch.
+    """
+    clean, errors = validate_schedules(frame)
+    report = ImportReport(len(frame), errors)
+    if dry_run or (strict and errors):
+        return report
+
+    valid = clean.drop(index=[row - 1 for row in report.rejected_rows])
+    records = [
+        {
+            'program_id': int(row.program_id),
+            'year': int(row.year),
+            'course_id': int(row.course_id),
+            'teacher_id': int(row.teacher_id),
+            'group_id': None if pd.isna(row.group_id) else int(row.group_id),
+            'room_id': int(row.room_id),
+            'day': row.day,
+            'start_time': row.start_time,
+            'end_time': row.end_time
+        }
+        for row in valid.itertuples(index=False)
+    ]
+    if records:
+        try:
+            # Core inserts bypass the ORM session hooks: update the teacher loads first,
+            # while a missing counter can still be computed from the stored rows
+            deltas = {}
+            for record in records:
+                teacher_id = record['teacher_id']
+                deltas[teacher_id] = deltas.get(teacher_id, 0) + slot_minutes(record['start_time'], record['end_time'])
+            apply_load_changes(db.session, deltas)
+            db.session.execute(insert(Schedule), records)
+            bump_versions(db.session, {'schedule'})
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        schedule_index.invalidate()
+    report.inserted = len(records)
+    return report
@@ -0,0 +1,80 @@
+# statistics.py
+import threading
+
+from sqlalchemy import func, select
+
+from core.cache import current_versions
+from core.extensions import db
+from core.metrics import record_cache
+from core.models import Department, Room, Schedule, Teacher, TeacherLoad
+from patterns.teacher_load import scheduled_minutes
+
+# Tables the dashboard statistics are derived from
+STATISTICS_SCOPES = ('department', 'teacher', 'room', 'schedule')
+# Tables the teacher hours chart is derived from
+CHART_SCOPES = ('schedule', 'teacher')
+
+class WorkloadStatistics:
+    """Dashboard counts and weekly hours per teacher (in Teacher.id order)."""
+    def __init__(self, departments_count, teachers_count, rooms_count, schedules_count, teachers):
+        self.departments_count = departments_count
+        self.teachers_count = teachers_count
+        self.rooms_count = rooms_count
+        self.schedules_count = schedules_count
+        self.teachers = teachers    # [(teacher id, "first last", hours)]
+
+    @property
+    def teacher_labels(self):
+        return [label for _id, label, _hours in self.teachers]
+
+    @property
+    def teacher_hours(self):
+        return [hours for _id, _label, hours in self.teachers]
+
+    def ranked(self):
+        """(labels, hours) with the busiest teacher first."""
+        ranked = sorted(self.teachers, key=lambda item: -item[2])
+        return [label for _id, label, _hours in ranked], [hours for _id, _label, hours in ranked]
+
+def _load_statistics():
+    counts = db.session.query(
+        select(func.count(Department.id)).scalar_subquery(),
+        select(func.count(Teacher.id)).scalar_subquery(),
+        select(func.count(Room.id)).scalar_subquery(),
+        select(func.count(Schedule.id)).scalar_subquery()
+    ).one()
+
+    # Teachers without a counter yet (see patterns.teacher_load) fall back to their rows
+    fallback = select(func.coalesce(func.sum(scheduled_minutes()), 0)).where(
+        Schedule.teacher_id == Teacher.id
+    ).correlate(Teacher).scalar_subquery()
+    rows = db.session.query(
+        Teacher.id, Teacher.first_name, Teacher.last_name,
+        func.coalesce(TeacherLoad.minutes, fallback)
+    ).outerjoin(TeacherLoad, TeacherLoad.teacher_id == Teacher.id).order_by(Teacher.id).all()
+
+    teachers = [
+        (teacher_id, f"{first_name} {last_name}", round(float(minutes) / 60, 2))
+        for teacher_id, first_name, last_name, minutes in rows
+    ]
+    return WorkloadStatistics(*counts, teachers)
+
+_lock = threading.Lock()
+_cached = {}
+
+def workload_statistics():
+    """Return WorkloadStatistics, recomputed only when one of STATISTICS_SCOPES changed."""
+    versions = current_versions(*STATISTICS_SCOPES)
+    with _lock:
+        if _cached.get('versions') == versions:
+            record_cache('statistics', True)
+            return _cached['value']
+    record_cache('statistics', False)
+    value = _load_statistics()
+    with _lock:
+        _cached['versions'], _cached['value'] = versions, value
+    return value
+
+def clear_statistics_cache():
+    with _lock:
+        _cached.clear()
@@ -0,0 +1,164 @@
+# synthetic.py
+import random
+from datetime import datetime
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from core.cache import VERSIONED_TABLES, bump_versions
+from core.models import Course, Department, Program, Room, Schedule, StudentGroup, Teacher, User
+from patterns.conflicts import schedule_index, to_minutes
+from patterns.grid import DAYS, TIME_SLOTS
+from patterns.teacher_load import reconcile_teacher_loads
+
+# Password of every generated account
+SYNTHETIC_PASSWORD = 'synthetic'
+COURSE_TYPES = ('Cours', 'TD', 'TP')
+ROOM_TYPES = {'Cours': 'Amphi', 'TD': 'Salle TD', 'TP': 'Salle TP'}
+
+def _insert(session, model, rows, key):
+    """Bulk insert `rows` and return their ids in the same order, matched on the unique-per-batch `key` column."""
+    if not rows:
+        return []
+    session.execute(insert(model), rows)
+    column = getattr(model, key)
+    ids = dict(session.query(column, model.id).filter(column.in_([row[key] for row in rows])))
+    return [ids[row[key]] for row in rows]
+
+def generate_dataset(session, departments=6, programs=4, groups=4, courses=10, teachers=200, rooms=80, seed=0):
+    """Add a faculty-sized synthetic dataset and return the number of rows created per table.
+
+    `programs`, `groups` and `courses` are per department, program and
+    program respectively. Every course is scheduled once: a 'Cours' for
+    the whole program, a TD or TP once per group. Sessions are placed
+    greedily on free (day, slot) cells, so the result has no room, teacher
+    or group conflict and respects each teacher's max_hours; sessions that
+    find no cell are left out. Names carry a `syn<seed>` tag; generating
+    the same seed twice is refused. The caller commits.
+    """
+    if teachers < 1 or rooms < len(COURSE_TYPES):
+        raise ValueError('Au moins un enseignant et une salle par type de cours sont nécessaires.')
+    tag = f'syn{seed}'
+    if session.query(User.id).filter(User.username == f'{tag}t0').first():
+        raise ValueError(f'Les données synthétiques "{tag}" existent déjà.')
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password_hash = generate_password_hash(SYNTHETIC_PASSWORD)  # one KDF run shared by every account
+
+    department_ids = _insert(session, Department, [
+        {'name': f'{tag} Département {d + 1}', 'description': 'Données synthétiques', 'created_at': now}
+        for d in range(departments)
+    ], 'name')
+    program_rows = [
+        {'name': f'{tag} Filière {d + 1}.{p + 1}', 'department_id': department_id,
+         'duration': 3, 'year': p % 3 + 1, 'created_at': now}
+        for d, department_id in enumerate(department_ids) for p in range(programs)
+    ]
+    program_ids = _insert(session, Program, program_rows, 'name')
+    group_rows = [
+        {'name': f'{tag} G{p + 1}.{g + 1}', 'program_id': program_id, 'size': rng.randint(20, 40), 'created_at': now}
+        for p, program_id in enumerate(program_ids) for g in range(groups)
+    ]
+    group_ids = _insert(session, StudentGroup, group_rows, 'name')
+    room_rows = [
+        {'name': f'{tag} {ROOM_TYPES[COURSE_TYPES[r % 3]]} {r + 1}', 'capacity': 200 if r % 3 == 0 else 40,
+         'type': ROOM_TYPES[COURSE_TYPES[r % 3]], 'created_at': now}
+        for r in range(rooms)
+    ]
+    room_ids = _insert(session, Room, room_rows, 'name')
+
+    user_ids = _insert(session, User, [
+        {'username': f'{tag}t{t}', 'email': f'{tag}t{t}@example.invalid', 'password_hash': password_hash,
+         'role': 'teacher', 'created_at': now}
+        for t in range(teachers)
+    ], 'username')
+    teacher_rows = [
+        {'user_id': user_id, 'first_name': f'Prénom{t}', 'last_name': f'{tag} Nom{t}',
+         'type': 'Permanent' if t % 3 == 0 else 'Vacataire', 'max_hours': 20 if t % 3 == 0 else 12, 'created_at': now}
+        for t, user_id in enumerate(user_ids)
+    ]
+    teacher_ids = _insert(session, Teacher, teacher_rows, 'user_id')
+    # One student account per group, for the student dashboards
+    _insert(session, User, [
+        {'username': f'{tag}s{g}', 'email': f'{tag}s{g}@example.invalid', 'password_hash': password_hash,
+         'role': 'student', 'program_id': row['program_id'], 'year': program_rows[program_ids.index(row['program_id'])]['year'],
+         'group_id': group_id, 'created_at': now}
+        for g, (row, group_id) in enumerate(zip(group_rows, group_ids))
+    ], 'username')
+
+    groups_of = {}
+    for row, group_id in zip(group_rows, group_ids):
+        groups_of.setdefault(row['program_id'], []).append(group_id)
+    slot_minutes = [to_minutes(end) - to_minutes(start) for start, end in TIME_SLOTS]
+    free_minutes = {teacher_id: row['max_hours'] * 60 for teacher_id, row in zip(teacher_ids, teacher_rows)}
+    planned = dict(free_minutes)
+    course_rows, course_meta = [], []
+    for p, program_id in enumerate(program_ids):
+        for c in range(courses):
+            course_type = COURSE_TYPES[0] if c % 3 == 0 else COURSE_TYPES[1 + c % 2]
+            # First teacher, from a random start, with room in max_hours for all the course's sessions
+            need = max(slot_minutes) * (1 if course_type == 'Cours' else len(groups_of[program_id]))
+            start = rng.randrange(len(teacher_ids))
+            teacher_id = next(
+                (teacher_ids[(start + i) % len(teacher_ids)] for i in range(len(teacher_ids))
+                 if planned[teacher_ids[(start + i) % len(teacher_ids)]] >= need),
+                teacher_ids[start]
+            )
+            planned[teacher_id] -= need
+            course_rows.append({
+                'name': f'Module {c + 1}', 'code': f'{tag}-{p + 1}-{c + 1}', 'type': course_type, 'duration': 30,
+                'program_id': program_id, 'teacher_id': teacher_id, 'created_at': now
+            })
+            course_meta.append((program_id, program_rows[p]['year'], course_type))
+    course_ids = _insert(session, Course, course_rows, 'code')
+
+    # Greedy conflict-free placement
+    cells = [(day, slot) for day in DAYS for slot in range(len(TIME_SLOTS))]
+    busy_rooms, busy_teachers, busy_groups = set(), set(), set()
+    rooms_by_type = {}
+    for room_id, row in zip(room_ids, room_rows):
+        rooms_by_type.setdefault(row['type'], []).append(room_id)
+    schedules = []
+    for course_id, row, (program_id, year, course_type) in zip(course_ids, course_rows, course_meta):
+        teacher_id = row['teacher_id']
+        for group_id in ([None] if course_type == 'Cours' else groups_of[program_id]):
+            # A program-wide session occupies every group of the program
+            audience = groups_of[program_id] if group_id is None else [group_id]
+            rng.shuffle(cells)
+            for day, slot in cells:
+                start, end = TIME_SLOTS[slot]
+                minutes = slot_minutes[slot]
+                if ((teacher_id, day, slot) in busy_teachers or free_minutes[teacher_id] < minutes
+                        or any((g, day, slot) in busy_groups for g in audience)):
+                    continue
+                room_id = next((r for r in rooms_by_type[ROOM_TYPES[course_type]] if (r, day, slot) not in busy_rooms), None)
+                if room_id is None:
+                    continue
+                busy_teachers.add((teacher_id, day, slot))
+                busy_rooms.add((room_id, day, slot))
+                busy_groups.update((g, day, slot) for g in audience)
+                free_minutes[teacher_id] -= minutes
+                schedules.append({
+                    'program_id': program_id, 'year': year, 'course_id': course_id, 'teacher_id': teacher_id,
+                    'group_id': group_id, 'room_id': room_id, 'day': day,
+                    'start_time': datetime.strptime(start, '%H:%M').time(),
+                    'end_time': datetime.strptime(end, '%H:%M').time(), 'created_at': now
+                })
+                break
+    if schedules:
+        session.execute(insert(Schedule), schedules)
+
+    # Core inserts skip the session hooks: rebuild the load counters and bump every version
+    reconcile_teacher_loads(session)
+    bump_versions(session, set(VERSIONED_TABLES))
+    schedule_index.invalidate()
+    return {
+        'departments': len(department_ids),
+        'programs': len(program_ids),
+        'groups': len(group_ids),
+        'rooms': len(room_ids),
+        'teachers': len(teacher_ids),
+        'students': len(group_ids),
+        'courses': len(course_ids),
+        'schedules': len(schedules)
+    }
@@ -0,0 +1,173 @@
+# teacher_import.py
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from core.cache import bump_versions
+from core.extensions import db
+from core.models import Teacher, User
+from core.security import canonical_method
+from core.utils import process_context, teacher_account_email
+from patterns.outbox import queue_emails
+from patterns.schedule_import import ImportReport
+
+COLUMNS = ['username', 'email', 'first_name', 'last_name', 'password', 'type', 'max_hours']
+REQUIRED = ['username', 'email', 'first_name', 'last_name']
+TEACHER_TYPES = ('Permanent', 'Vacataire')
+# Length limits of the User / Teacher columns
+LIMITS = {'username': 20, 'email': 120, 'first_name': 50, 'last_name': 50}
+
+def read_teacher_file(stream, filename):
+    """Load a CSV or XLSX file of teachers into a DataFrame with the expected columns."""
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension == '.csv':
+        frame = pd.read_csv(stream, dtype=str, keep_default_na=False)
+    elif extension in ('.xlsx', '.xls'):
+        frame = pd.read_excel(stream, dtype=str, keep_default_na=False)
+    else:
+        raise ValueError('Format non supporté (CSV ou XLSX attendu).')
+    frame.columns = [str(column).strip().lower() for column in frame.columns]
+    missing = [column for column in REQUIRED if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes : {', '.join(missing)}")
+    for column in COLUMNS:
+        if column not in frame.columns:
+            frame[column] = ''
+    return frame[COLUMNS].fillna('').astype(str).apply(lambda column: column.str.strip()).reset_index(drop=True)
+
+def validate_teachers(frame, send_emails=True):
+    """Validate a batch of teachers; return (rows, errors).
+
+    Usernames and emails are checked against one query fetching the
+    existing ones that appear in the file, then with set lookups, which
+    also catch duplicates inside the file. A missing password is generated
+    when the welcome emails are sent (they carry it), and required
+    otherwise. `rows` holds one dict per valid row, by 0-based index.
+    """
+    errors = []
+    usernames = [value for value in frame['username'] if value]
+    emails = [value.lower() for value in frame['email'] if value]
+    taken_usernames, taken_emails = set(), set()
+    if usernames or emails:
+        for username, email in db.session.query(User.username, User.email).filter(
+            db.or_(User.username.in_(usernames), db.func.lower(User.email).in_(emails))
+        ):
+            taken_usernames.add(username)
+            taken_emails.add(email.lower())
+
+    rows = {}
+    seen_usernames, seen_emails = set(), set()
+    for index, record in frame.iterrows():
+        row_errors = []
+
+        def error(field, message):
+            row_errors.append({'row': int(index) + 1, 'field': field, 'message': message})
+
+        for field in REQUIRED:
+            if not record[field]:
+                error(field, 'Champ obligatoire.')
+            elif len(record[field]) > LIMITS[field]:
+                error(field, f'{LIMITS[field]} caractères maximum.')
+        username, email = record['username'], record['email'].lower()
+        if username and (username in taken_usernames or username in seen_usernames):
+            error('username', "Ce nom d'utilisateur existe déjà.")
+        if email and '@' not in email:
+            error('email', 'Adresse email invalide.')
+        elif email and (email in taken_emails or email in seen_emails):
+            error('email', 'Cet email est déjà utilisé.')
+        seen_usernames.add(username)
+        seen_emails.add(email)
+
+        teacher_type = record['type'] or 'Vacataire'
+        if teacher_type not in TEACHER_TYPES:
+            error('type', f"Type invalide (attendu : {', '.join(TEACHER_TYPES)}).")
+        try:
+            max_hours = int(record['max_hours']) if record['max_hours'] else 20
+            if max_hours <= 0:
+                raise ValueError(max_hours)
+        except ValueError:
+            error('max_hours', 'Nombre d\'heures entier positif attendu.')
+        if not record['password'] and not send_emails:
+            error('password', "Mot de passe requis lorsque les emails ne sont pas envoyés.")
+
+        if row_errors:
+            errors.extend(row_errors)
+            continue
+        rows[index] = {
+            'username': username,
+            'email': record['email'],
+            'first_name': record['first_name'],
+            'last_name': record['last_name'],
+            'password': record['password'] or secrets.token_urlsafe(9),
+            'type': teacher_type,
+            'max_hours': max_hours
+        }
+    return rows, errors
+
+def _hash_password(job):
+    password, method, salt_length = job
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+def hash_passwords(passwords, method, salt_length, workers=None):
+    """Hash `passwords` in parallel processes (the KDF cost dominates a bulk import)."""
+    jobs = [(password, method, salt_length) for password in passwords]
+    workers = workers or os.cpu_count() or 1
+    if len(jobs) < 2 or workers == 1:
+        return [_hash_password(job) for job in jobs]
+    # Called from the admin web route: never fork the threaded worker (see core.utils.process_context)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=process_context()) as pool:
+        return list(pool.map(_hash_password, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+
+def import_teachers(frame, config, strict=False, dry_run=False, send_emails=True, login_url=None, workers=None):
+    """Validate `frame` and create the valid teachers in one transaction.
+
+    Users and teachers are written with two bulk inserts (the user ids
+    are read back with one query in between) and the welcome emails are
+    queued in the same transaction. With `strict`, any error rejects the
+    whole batch.
+    """
+    rows, errors = validate_teachers(frame, send_emails=send_emails)
+    report = ImportReport(len(frame), errors)
+    if dry_run or (strict and errors) or not rows:
+        return report
+
+    records = list(rows.values())
+    hashes = hash_passwords([record['password'] for record in records],
+                            canonical_method(config['PASSWORD_HASH_METHOD']),
+                            config['PASSWORD_SALT_LENGTH'], workers=workers)
+    try:
+        db.session.execute(insert(User), [
+            {'username': record['username'], 'email': record['email'], 'role': 'teacher', 'password_hash': pwhash}
+            for record, pwhash in zip(records, hashes)
+        ])
+        user_ids = dict(db.session.query(User.username, User.id).filter(
+            User.username.in_([record['username'] for record in records])
+        ))
+        db.session.execute(insert(Teacher), [
+            {
+                'user_id': user_ids[record['username']],
+                'first_name': record['first_name'],
+                'last_name': record['last_name'],
+                'type': record['type'],
+                'max_hours': record['max_hours']
+            }
+            for record in records
+        ])
+        # Core inserts bypass the session hooks that bump the data versions
+        bump_versions(db.session, {'teacher'})
+        if send_emails:
+            queue_emails([
+                teacher_account_email(record['email'], record['username'], record['password'],
+                                      record['first_name'], record['last_name'], login_url=login_url)
+                for record in records
+            ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    report.inserted = len(records)
+    return report
@@ -0,0 +1,187 @@
+# teacher_load.py
+from collections import defaultdict
+
+from sqlalchemy import Integer, event, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import FunctionElement
+
+from core.cache import bump_versions
+from core.extensions import db
+from core.models import Schedule, Teacher, TeacherLoad
+from patterns.conflicts import to_minutes
+
+class seconds_between(FunctionElement):
+    """SQL expression for `end - start` in seconds for two TIME columns."""
+    type = Integer()
+    inherit_cache = True
+    name = 'seconds_between'
+
+@compiles(seconds_between)
+def _seconds_between_default(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return f"(TIME_TO_SEC({compiler.process(end, **kw)}) - TIME_TO_SEC({compiler.process(start, **kw)}))"
+
+@compiles(seconds_between, 'sqlite')
+def _seconds_between_sqlite(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return (f"(CAST(strftime('%s', {compiler.process(end, **kw)}) AS INTEGER)"
+            f" - CAST(strftime('%s', {compiler.process(start, **kw)}) AS INTEGER))")
+
+@compiles(seconds_between, 'postgresql')
+def _seconds_between_postgresql(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return f"CAST(EXTRACT(EPOCH FROM ({compiler.process(end, **kw)} - {compiler.process(start, **kw)})) AS INTEGER)"
+
+def scheduled_minutes():
+    """SQL expression for the length of a Schedule row in minutes."""
+    seconds = seconds_between(Schedule.start_time, Schedule.end_time)
+    # Slots crossing midnight count until the end time on the next day
+    seconds = db.case((seconds < 0, seconds + 24 * 3600), else_=seconds)
+    return seconds / 60
+
+def slot_minutes(start_time, end_time):
+    """Python counterpart of scheduled_minutes() for time objects or 'HH:MM' strings."""
+    minutes = to_minutes(end_time) - to_minutes(start_time)
+    return minutes + 24 * 60 if minutes < 0 else minutes
+
+class TeacherOverloadError(ValueError):
+    """Raised when a change would push a teacher above Teacher.max_hours."""
+    def __init__(self, teacher_id, name, minutes, max_hours):
+        self.teacher_id = teacher_id
+        self.minutes = minutes
+        self.max_hours = max_hours
+        super().__init__(
+            f"Heures max dépassées pour {name} : {minutes / 60:.1f}h planifiées "
+            f"pour {max_hours}h autorisées par semaine."
+        )
+
+def teacher_loads(connection, teacher_ids):
+    """{teacher id: (name, minutes, max_hours, has counter)} for `teacher_ids`.
+
+    Teachers without a counter yet get their minutes computed from their rows.
+    """
+    loads = TeacherLoad.__table__
+    rows = connection.execute(
+        select(Teacher.id, Teacher.first_name, Teacher.last_name, Teacher.max_hours, loads.c.minutes)
+        .outerjoin(loads, loads.c.teacher_id == Teacher.id)
+        .where(Teacher.id.in_(teacher_ids))
+    ).all()
+    missing = [row.id for row in rows if row.minutes is None]
+    counted = _count_minutes(connection, missing) if missing else {}
+    return {
+        row.id: (f"{row.first_name} {row.last_name}",
+                 row.minutes if row.minutes is not None else counted[row.id],
+                 row.max_hours,
+                 row.minutes is not None)
+        for row in rows
+    }
+
+def apply_load_changes(session, deltas):
+    """Add `deltas` ({teacher id: minutes}) to the counters in the current transaction.
+
+    Each increase is a conditional UPDATE (`minutes + delta <= max_hours`)
+    that checks and writes the counter in one statement, so two concurrent
+    saves for the same teacher cannot both pass the check. Raises
+    TeacherOverloadError when an increase would exceed a teacher's
+    max_hours; counters already changed by this call are undone by the
+    caller's rollback.
+    """
+    deltas = {teacher_id: minutes for teacher_id, minutes in deltas.items() if minutes}
+    if not deltas:
+        return
+    connection = session.connection()
+    current = teacher_loads(connection, list(deltas))
+
+    loads = TeacherLoad.__table__
+    # Always in teacher id order, so concurrent transactions lock the counters in the same order
+    for teacher_id, (name, minutes, max_hours, stored) in sorted(current.items()):
+        delta = deltas[teacher_id]
+        limit = max_hours * 60 if delta > 0 and max_hours is not None else None
+        if not stored:
+            if limit is not None and minutes + delta > limit:
+                raise TeacherOverloadError(teacher_id, name, minutes + delta, max_hours)
+            try:
+                with connection.begin_nested():
+                    connection.execute(loads.insert().values(teacher_id=teacher_id, minutes=minutes + delta))
+                continue
+            except IntegrityError:
+                pass  # created meanwhile by a concurrent save: go through the conditional update
+        update = loads.update().where(loads.c.teacher_id == teacher_id).values(minutes=loads.c.minutes + delta)
+        if limit is not None:
+            update = update.where(loads.c.minutes + delta <= limit)
+        if connection.execute(update).rowcount == 0:
+            latest = connection.execute(select(loads.c.minutes).where(loads.c.teacher_id == teacher_id)).scalar()
+            raise TeacherOverloadError(teacher_id, name, (latest if latest is not None else minutes) + delta, max_hours)
+
+def _count_minutes(connection, teacher_ids=None):
+    """Minutes per teacher recomputed from Schedule (every teacher by default)."""
+    query = select(Teacher.id, func.coalesce(func.sum(scheduled_minutes()), 0)).outerjoin(
+        Schedule, Schedule.teacher_id == Teacher.id
+    ).group_by(Teacher.id)
+    if teacher_ids is not None:
+        query = query.where(Teacher.id.in_(teacher_ids))
+    return {teacher_id: int(round(minutes)) for teacher_id, minutes in connection.execute(query)}
+
+def reconcile_teacher_loads(session, dry_run=False):
+    """Rebuild every counter from Schedule in bulk.
+
+    Returns [(teacher id, stored minutes or None, actual minutes)] for the
+    counters that had drifted. The caller commits.
+    """
+    connection = session.connection()
+    loads = TeacherLoad.__table__
+    actual = _count_minutes(connection)
+    stored = dict(connection.execute(select(loads.c.teacher_id, loads.c.minutes)).all())
+
+    drift = [
+        (teacher_id, stored.get(teacher_id), minutes)
+        for teacher_id, minutes in sorted(actual.items())
+        if stored.get(teacher_id) != minutes
+    ]
+    orphans = sorted(set(stored) - set(actual))
+    drift.extend((teacher_id, stored[teacher_id], 0) for teacher_id in orphans)
+    if dry_run:
+        return drift
+
+    updates = [
+        {'key': teacher_id, 'minutes': minutes}
+        for teacher_id, previous, minutes in drift
+        if previous is not None and teacher_id not in orphans
+    ]
+    inserts = [{'teacher_id': teacher_id, 'minutes': minutes} for teacher_id, previous, minutes in drift if previous is None]
+    if updates:
+        connection.execute(
+            loads.update().where(loads.c.teacher_id == db.bindparam('key')).values(minutes=db.bindparam('minutes')),
+            updates
+        )
+    if inserts:
+        connection.execute(loads.insert(), inserts)
+    if orphans:
+        connection.execute(loads.delete().where(loads.c.teacher_id.in_(orphans)))
+    if drift:
+        bump_versions(session, {'teacher'})
+    return drift
+
+@event.listens_for(Session, 'before_flush')
+def _update_teacher_loads(session, flush_context, instances):
+    deltas = defaultdict(int)
+    changed = [obj for obj in session.dirty if isinstance(obj, Schedule) and session.is_modified(obj)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Schedule)]
+
+    # The previous values are still the stored ones until this flush runs
+    previous_ids = [obj.id for obj in changed + deleted if obj.id is not None]
+    if previous_ids:
+        previous = session.connection().execute(
+            select(Schedule.teacher_id, Schedule.start_time, Schedule.end_time)
+            .where(Schedule.id.in_(previous_ids))
+        )
+        for teacher_id, start_time, end_time in previous:
+            deltas[teacher_id] -= slot_minutes(start_time, end_time)
+
+    for obj in changed + [obj for obj in session.new if isinstance(obj, Schedule)]:
+        if obj.teacher_id not in (None, '') and obj.start_time and obj.end_time:
+            deltas[int(obj.teacher_id)] += slot_minutes(obj.start_time, obj.end_time)
+
+    apply_load_changes(session, deltas)
@@ -0,0 +1,505 @@
+# timetable.py
+import math
+import os
+import pickle
+import random
+import time as _time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from core.extensions import db
+from core.models import Course, Program, Room, Schedule, StudentGroup, Teacher
+from patterns.conflicts import to_minutes
+from patterns.grid import DAYS, TIME_SLOTS
+
+# Room type expected for each course type
+ROOM_TYPES = {'Cours': 'Amphi', 'TD': 'Salle TD', 'TP': 'Salle TP'}
+
+# Soft constraint weights
+LATE_SLOT_PENALTY = 1
+SATURDAY_PENALTY = 2
+ROOM_TYPE_PENALTY = 2
+GAP_PENALTY = 1
+SAME_DAY_PENALTY = 3
+# Weight of one hard violation (an unplaced session) in the search objective
+HARD_WEIGHT = 1000
+
+SLOT_COUNT = len(DAYS) * len(TIME_SLOTS)
+SLOT_MINUTES = [to_minutes(end) - to_minutes(start) for start, end in TIME_SLOTS]
+
+def slot_day(slot):
+    return slot // len(TIME_SLOTS)
+
+def slot_period(slot):
+    return slot % len(TIME_SLOTS)
+
+class Event:
+    """One weekly session to place: a course for a group (or the whole program)."""
+    __slots__ = ('index', 'program_id', 'year', 'course_id', 'teacher_id', 'group_id', 'groups', 'size',
+                 'room_type', 'rooms')
+
+    def __init__(self, index, program_id, year, course_id, teacher_id, group_id, groups, size, room_type, rooms):
+        self.index = index
+        self.program_id = program_id
+        self.year = year
+        self.course_id = course_id
+        self.teacher_id = teacher_id
+        self.group_id = group_id      # None for lectures shared by every group
+        self.groups = groups          # group ids kept busy by the session
+        self.size = size
+        self.room_type = room_type
+        self.rooms = rooms            # ids of rooms large enough, smallest first
+
+class TimetableProblem:
+    """Plain-data description of the timetables of one or more program/years.
+
+    Everything needed by the solver is copied out of the database into
+    ints, tuples and dicts, so a problem can be pickled and solved without
+    an application context.
+    """
+    def __init__(self, targets, events, room_types, teacher_minutes, blocked_rooms, blocked_teachers, blocked_groups):
+        self.targets = targets                      # [(program id, year)] whose timetables are built
+        self.events = events
+        self.room_types = room_types                # room id -> room type
+        self.teacher_minutes = teacher_minutes      # teacher id -> minutes still available
+        self.blocked_rooms = blocked_rooms          # {(room id, slot)} used by other timetables
+        self.blocked_teachers = blocked_teachers    # {(teacher id, slot)} used by other timetables
+        self.blocked_groups = blocked_groups        # {(group id, slot)} used by other timetables
+
+class SolveResult:
+    """Outcome of a solver run with the figures used for benchmarking."""
+    def __init__(self, placements, hard, soft, elapsed, iterations, initial_hard, initial_soft, seed=None):
+        self.placements = placements    # event index -> (slot, room id)
+        self.hard = hard
+        self.soft = soft
+        self.elapsed = elapsed
+        self.iterations = iterations
+        self.initial_hard = initial_hard
+        self.initial_soft = initial_soft
+        self.seed = seed
+
+    @property
+    def objective(self):
+        return self.hard * HARD_WEIGHT + self.soft
+
+    def to_dict(self):
+        return {
+            'hard': self.hard,
+            'soft': self.soft,
+            'placed': len(self.placements),
+            'elapsed': round(self.elapsed, 3),
+            'iterations': self.iterations,
+            'initial_hard': self.initial_hard,
+            'initial_soft': self.initial_soft,
+            'seed': self.seed
+        }
+
+def sessions_per_week(duration_hours, weeks):
+    """Weekly sessions needed to cover a course's total hours over the semester."""
+    slot_hours = SLOT_MINUTES[0] / 60
+    return max(1, math.ceil((duration_hours or 0) / (slot_hours * weeks)))
+
+def _overlapping_slots(day, start_time, end_time):
+    if day not in DAYS:
+        return []
+    start, end = to_minutes(start_time), to_minutes(end_time)
+    base = DAYS.index(day) * len(TIME_SLOTS)
+    return [
+        base + period for period, (slot_start, slot_end) in enumerate(TIME_SLOTS)
+        if start < to_minutes(slot_end) and end > to_minutes(slot_start)
+    ]
+
+def load_problem(program_id, year, weeks=15):
+    """Build a TimetableProblem for a single program/year."""
+    return _build_problem([(int(program_id), int(year))], weeks)
+
+def load_faculty_problem(weeks=15):
+    """Build one TimetableProblem covering every program at its academic year."""
+    targets = [(program.id, program.year) for program in Program.query.order_by(Program.id).all()]
+    return _build_problem(targets, weeks)
+
+def _build_problem(targets, weeks):
+    """Copy the data of `targets` out of the database.
+
+    Schedules of every other program/year stay in place and block their
+    rooms, teachers and groups; the targets' own rows are meant to be replaced.
+    """
+    program_ids = [program_id for program_id, _year in targets]
+    groups_by_program = defaultdict(list)
+    for group in StudentGroup.query.filter(StudentGroup.program_id.in_(program_ids)).order_by(StudentGroup.id):
+        groups_by_program[group.program_id].append(group)
+    courses_by_program = defaultdict(list)
+    for course in Course.query.filter(Course.program_id.in_(program_ids)).order_by(Course.id):
+        courses_by_program[course.program_id].append(course)
+    rooms = Room.query.order_by(Room.id).all()
+    teacher_ids = {course.teacher_id for courses in courses_by_program.values() for course in courses}
+    teachers = Teacher.query.filter(Teacher.id.in_(teacher_ids)).all() if teacher_ids else []
+
+    others = db.session.query(
+        Schedule.teacher_id, Schedule.room_id, Schedule.group_id, Schedule.day, Schedule.start_time,
+        Schedule.end_time
+    )
+    if targets:
+        others = others.filter(db.not_(db.or_(*[
+            db.and_(Schedule.program_id == program_id, Schedule.year == year) for program_id, year in targets
+        ])))
+
+    teacher_minutes = {teacher.id: (teacher.max_hours or 0) * 60 for teacher in teachers}
+    blocked_rooms, blocked_teachers, blocked_groups = set(), set(), set()
+    for teacher_id, room_id, group_id, day, start_time, end_time in others:
+        if teacher_id in teacher_minutes:
+            teacher_minutes[teacher_id] -= to_minutes(end_time) - to_minutes(start_time)
+        for slot in _overlapping_slots(day, start_time, end_time):
+            blocked_rooms.add((room_id, slot))
+            blocked_teachers.add((teacher_id, slot))
+            if group_id is not None:
+                blocked_groups.add((group_id, slot))
+
+    room_capacity = {room.id: room.capacity for room in sorted(rooms, key=lambda room: (room.capacity, room.id))}
+
+    events = []
+    for program_id, year in targets:
+        groups = groups_by_program[program_id]
+        # A group is busy whatever the year it is taught for, as in check_schedule_conflicts,
+        # so occupancy is tracked per group id ((program, year) stands for a program without groups)
+        group_keys = {group.id: group.id for group in groups}
+        all_groups = tuple(group_keys.values()) or ((program_id, year),)
+        total_size = sum(group.size or 0 for group in groups) or 30
+        for course in courses_by_program[program_id]:
+            if course.type == 'Cours' or not groups:
+                sessions = [(None, all_groups, total_size)]
+            else:
+                sessions = [(group.id, (group_keys[group.id],), group.size or 0) for group in groups]
+            for _ in range(sessions_per_week(course.duration, weeks)):
+                for group_id, busy_groups, size in sessions:
+                    fitting = tuple(room_id for room_id, capacity in room_capacity.items() if capacity >= size)
+                    events.append(Event(len(events), program_id, year, course.id, course.teacher_id, group_id,
+                                        busy_groups, size, ROOM_TYPES.get(course.type), fitting))
+
+    return TimetableProblem(
+        targets, events,
+        {room.id: room.type for room in rooms},
+        teacher_minutes, blocked_rooms, blocked_teachers, blocked_groups
+    )
+
+class _State:
+    """Mutable assignment with occupancy maps for O(1) feasibility checks."""
+    def __init__(self, problem):
+        self.problem = problem
+        self.placement = [None] * len(problem.events)
+        self.room_at = {}
+        self.teacher_at = {}
+        self.group_at = {}
+        self.teacher_left = dict(problem.teacher_minutes)
+        self.missing = set(range(len(problem.events)))
+        self.teacher_days = defaultdict(list)
+        self.group_days = defaultdict(list)
+        self.course_days = defaultdict(int)
+
+    def unplaced(self):
+        return [self.problem.events[index] for index in self.missing]
+
+    def blockers(self, event, slot, room_id):
+        """Placed events preventing `event` from taking (slot, room), or None if fixed rows do."""
+        problem = self.problem
+        if (room_id, slot) in problem.blocked_rooms or (event.teacher_id, slot) in problem.blocked_teachers:
+            return None
+        if any((group_id, slot) in problem.blocked_groups for group_id in event.groups):
+            return None
+        found = set()
+        for key, owner in (((room_id, slot), self.room_at), ((event.teacher_id, slot), self.teacher_at)):
+            index = owner.get(key)
+            if index is not None and index != event.index:
+                found.add(index)
+        for group_id in event.groups:
+            index = self.group_at.get((group_id, slot))
+            if index is not None and index != event.index:
+                found.add(index)
+        minutes = SLOT_MINUTES[slot_period(slot)]
+        left = self.teacher_left.get(event.teacher_id, 0)
+        current = self.placement[event.index]
+        if current is not None:
+            left += SLOT_MINUTES[slot_period(current[0])]
+        for index in found:
+            other = problem.events[index]
+            if other.teacher_id == event.teacher_id:
+                left += SLOT_MINUTES[slot_period(self.placement[index][0])]
+        if left < minutes:
+            return None
+        return found
+
+    def place(self, event, slot, room_id):
+        self.placement[event.index] = (slot, room_id)
+        self.missing.discard(event.index)
+        self.room_at[(room_id, slot)] = event.index
+        self.teacher_at[(event.teacher_id, slot)] = event.index
+        self.teacher_left[event.teacher_id] = self.teacher_left.get(event.teacher_id, 0) - SLOT_MINUTES[slot_period(slot)]
+        day = slot_day(slot)
+        self.teacher_days[(event.teacher_id, day)].append(slot_period(slot))
+        for group_id in event.groups:
+            self.group_at[(group_id, slot)] = event.index
+            self.group_days[(group_id, day)].append(slot_period(slot))
+            self.course_days[(event.course_id, group_id, day)] += 1
+
+    def remove(self, event):
+        slot, room_id = self.placement[event.index]
+        self.placement[event.index] = None
+        self.missing.add(event.index)
+        del self.room_at[(room_id, slot)]
+        del self.teacher_at[(event.teacher_id, slot)]
+        self.teacher_left[event.teacher_id] += SLOT_MINUTES[slot_period(slot)]
+        day = slot_day(slot)
+        self.teacher_days[(event.teacher_id, day)].remove(slot_period(slot))
+        for group_id in event.groups:
+            del self.group_at[(group_id, slot)]
+            self.group_days[(group_id, day)].remove(slot_period(slot))
+            self.course_days[(event.course_id, group_id, day)] -= 1
+
+    def event_cost(self, event):
+        placed = self.placement[event.index]
+        if placed is None:
+            return 0
+        slot, room_id = placed
+        cost = 0
+        if slot_period(slot) == len(TIME_SLOTS) - 1:
+            cost += LATE_SLOT_PENALTY
+        if DAYS[slot_day(slot)] == 'Samedi':
+            cost += SATURDAY_PENALTY
+        if event.room_type and self.problem.room_types.get(room_id) != event.room_type:
+            cost += ROOM_TYPE_PENALTY
+        return cost
+
+    @staticmethod
+    def _gaps(periods):
+        if len(periods) < 2:
+            return 0
+        return (max(periods) - min(periods) + 1 - len(set(periods))) * GAP_PENALTY
+
+    def day_cost(self, teacher_keys, group_keys, course_keys):
+        cost = sum(self._gaps(self.teacher_days.get(key, ())) for key in teacher_keys)
+        cost += sum(self._gaps(self.group_days.get(key, ())) for key in group_keys)
+        cost += sum(max(0, self.course_days.get(key, 0) - 1) * SAME_DAY_PENALTY for key in course_keys)
+        return cost
+
+    def affected_keys(self, events, days):
+        teacher_keys, group_keys, course_keys = set(), set(), set()
+        for event in events:
+            for day in days:
+                teacher_keys.add((event.teacher_id, day))
+                for group_id in event.groups:
+                    group_keys.add((group_id, day))
+                    course_keys.add((event.course_id, group_id, day))
+        return teacher_keys, group_keys, course_keys
+
+    def soft_score(self):
+        events = self.problem.events
+        cost = sum(self.event_cost(event) for event in events)
+        cost += self.day_cost(self.teacher_days.keys(), self.group_days.keys(), self.course_days.keys())
+        return cost
+
+    def hard_score(self):
+        return len(self.missing)
+
+    def free_room(self, event, slot):
+        """Smallest free room for `event` at `slot`, preferring the expected room type."""
+        fallback = None
+        for room_id in event.rooms:
+            if self.blockers(event, slot, room_id) != set():
+                continue
+            if not event.room_type or self.problem.room_types.get(room_id) == event.room_type:
+                return room_id
+            if fallback is None:
+                fallback = room_id
+        return fallback
+
+def _local_delta(state, event, target, evicted=()):
+    """Cost change of moving `event` to `target` ((slot, room) or None) after evicting others."""
+    touched = [event] + [state.problem.events[index] for index in evicted]
+    days = set()
+    for item in touched:
+        if state.placement[item.index] is not None:
+            days.add(slot_day(state.placement[item.index][0]))
+    if target is not None:
+        days.add(slot_day(target[0]))
+    keys = state.affected_keys(touched, days)
+    before = state.day_cost(*keys) + sum(state.event_cost(item) for item in touched)
+    before += HARD_WEIGHT * sum(1 for item in touched if state.placement[item.index] is None)
+
+    saved = [(item, state.placement[item.index]) for item in touched]
+    for item, placed in saved:
+        if placed is not None:
+            state.remove(item)
+    if target is not None:
+        state.place(event, *target)
+    after = state.day_cost(*keys) + sum(state.event_cost(item) for item in touched)
+    after += HARD_WEIGHT * sum(1 for item in touched if state.placement[item.index] is None)
+    return after - before, saved
+
+def _undo(state, event, target, saved):
+    if target is not None:
+        state.remove(event)
+    for item, placed in saved:
+        if placed is not None:
+            state.place(item, *placed)
+
+def _construct(state, rng):
+    """Greedy placement, most constrained sessions first."""
+    events = list(state.problem.events)
+    rng.shuffle(events)
+    events.sort(key=lambda event: (len(event.rooms), -len(event.groups), -event.size))
+    for event in events:
+        best, best_cost = [], None
+        for slot in range(SLOT_COUNT):
+            room_id = state.free_room(event, slot)
+            if room_id is None:
+                continue
+            delta, saved = _local_delta(state, event, (slot, room_id))
+            _undo(state, event, (slot, room_id), saved)
+            if best_cost is None or delta < best_cost:
+                best, best_cost = [(slot, room_id)], delta
+            elif delta == best_cost:
+                best.append((slot, room_id))
+        if best:
+            state.place(event, *rng.choice(best))
+
+def _random_option(event, rng):
+    return rng.randrange(SLOT_COUNT), rng.choice(event.rooms)
+
+def solve(problem, time_budget=10.0, seed=None, initial_temperature=2.0, initial=None):
+    """Constructive heuristic followed by simulated annealing.
+
+    Hard constraints (room, teacher and group clashes, room capacity and
+    Teacher.max_hours) are never violated by a placed session; sessions that
+    cannot be placed count as hard violations. Soft constraints are late
+    slots, Saturdays, room type mismatches, idle gaps in a day and a course
+    repeated on the same day for a group.
+
+    `initial` (event index -> (slot, room id)) starts the search from an
+    existing assignment instead of running the constructive pass.
+    """
+    started = _time.perf_counter()
+    rng = random.Random(seed)
+    state = _State(problem)
+    if initial:
+        for index, placed in initial.items():
+            state.place(problem.events[index], *placed)
+    else:
+        _construct(state, rng)
+    initial_hard, initial_soft = state.hard_score(), state.soft_score()
+
+    events = [event for event in problem.events if event.rooms]
+    current = initial_hard * HARD_WEIGHT + initial_soft
+    best_value, best_placement = current, list(state.placement)
+    iterations = 0
+    deadline = started + time_budget
+
+    while events and current > 0:
+        now = _time.perf_counter()
+        if now >= deadline:
+            break
+        temperature = max(0.05, initial_temperature * (deadline - now) / time_budget)
+        iterations += 1
+
+        unplaced = [event for event in state.unplaced() if event.rooms]
+        if unplaced and rng.random() < 0.5:
+            event = rng.choice(unplaced)
+        else:
+            event = rng.choice(events)
+        target = _random_option(event, rng)
+        found = state.blockers(event, *target)
+        # Allow evicting a single session so the search can leave local optima
+        if found is None or len(found) > 1:
+            continue
+
+        delta, saved = _local_delta(state, event, target, found)
+        if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+            current += delta
+            if current < best_value:
+                best_value, best_placement = current, list(state.placement)
+        else:
+            _undo(state, event, target, saved)
+
+    final = _State(problem)
+    for event in problem.events:
+        if best_placement[event.index] is not None:
+            final.place(event, *best_placement[event.index])
+    placements = {index: placed for index, placed in enumerate(best_placement) if placed is not None}
+    return SolveResult(
+        placements, final.hard_score(), final.soft_score(),
+        _time.perf_counter() - started, iterations,
+        initial_hard, initial_soft, seed
+    )
+
+_worker_problem = None
+
+def _init_worker(payload):
+    """Unpickle the shared problem once per worker process."""
+    global _worker_problem
+    _worker_problem = pickle.loads(payload)
+
+def _solve_in_worker(time_budget, seed, initial):
+    return solve(_worker_problem, time_budget=time_budget, seed=seed, initial=initial)
+
+def solve_parallel(problem, time_budget=10.0, workers=None, rounds=1, seed=None):
+    """Run randomized searches on every core and keep the best assignment.
+
+    The problem is pickled once and handed to each worker when the pool
+    starts. The first round runs independent restarts; each further round
+    restarts every worker from the best assignment found so far (an island
+    model where the best solution migrates between rounds).
+    """
+    started = _time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    rounds = max(1, rounds)
+    rng = random.Random(seed)
+    payload = pickle.dumps(problem, protocol=pickle.HIGHEST_PROTOCOL)
+    best, initial_scores, iterations = None, None, 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(payload,)) as pool:
+        for _round in range(rounds):
+            initial = best.placements if best is not None else None
+            futures = [
+                pool.submit(_solve_in_worker, time_budget / rounds, rng.randrange(2 ** 32), initial)
+                for _ in range(workers)
+            ]
+            for future in futures:
+                result = future.result()
+                iterations += result.iterations
+                if _round == 0:
+                    scores = (result.initial_hard, result.initial_soft)
+                    initial_scores = min(initial_scores or scores, scores)
+                if best is None or (result.hard, result.soft) < (best.hard, best.soft):
+                    best = result
+            if best.hard == 0 and best.soft == 0:
+                break
+
+    return SolveResult(
+        best.placements, best.hard, best.soft,
+        _time.perf_counter() - started, iterations,
+        initial_scores[0], initial_scores[1], best.seed
+    )
+
+def save_solution(problem, result):
+    """Replace the targets' timetables with the solver's placements (one transaction)."""
+    for program_id, year in problem.targets:
+        for schedule in Schedule.query.filter_by(program_id=program_id, year=year).all():
+            db.session.delete(schedule)
+    schedules = []
+    for index, (slot, room_id) in sorted(result.placements.items()):
+        event = problem.events[index]
+        start, end = TIME_SLOTS[slot_period(slot)]
+        schedules.append(Schedule(
+            program_id=event.program_id,
+            year=event.year,
+            course_id=event.course_id,
+            teacher_id=event.teacher_id,
+            group_id=event.group_id,
+            room_id=room_id,
+            day=DAYS[slot_day(slot)],
+            start_time=datetime.strptime(start, '%H:%M').time(),
+            end_time=datetime.strptime(end, '%H:%M').time()
+        ))
+    db.session.add_all(schedules)
+    db.session.commit()
+    return schedules
@@ -0,0 +1,99 @@
+# timetable_cache.py
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from werkzeug.http import is_resource_modified
+
+from core.cache import build_id, cache_key, data_state
+from core.metrics import record_cache
+from patterns.grid import TimetableGrid
+
+# Tables whose content appears in a dashboard timetable
+TIMETABLE_SCOPES = ('schedule', 'course', 'room', 'teacher', 'program', 'student_group')
+
+def snapshot(schedule):
+    """Session-independent copy of a Schedule with the attributes the templates read."""
+    return SimpleNamespace(
+        id=schedule.id,
+        program_id=schedule.program_id,
+        year=schedule.year,
+        course_id=schedule.course_id,
+        teacher_id=schedule.teacher_id,
+        group_id=schedule.group_id,
+        room_id=schedule.room_id,
+        day=schedule.day,
+        start_time=schedule.start_time,
+        end_time=schedule.end_time,
+        program=SimpleNamespace(name=schedule.program.name),
+        course=SimpleNamespace(name=schedule.course.name, type=schedule.course.type),
+        teacher=SimpleNamespace(first_name=schedule.teacher.first_name, last_name=schedule.teacher.last_name),
+        group=SimpleNamespace(name=schedule.group.name) if schedule.group else None,
+        room=SimpleNamespace(name=schedule.room.name)
+    )
+
+class TimetableCache:
+    """Per-process LRU of TimetableGrid snapshots.
+
+    Keys embed the data versions of TIMETABLE_SCOPES, so a committed write
+    makes every older entry unreachable; those age out as new entries push
+    the cache past TIMETABLE_CACHE_SIZE.
+    """
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build, max_entries):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                record_cache('timetable', True)
+                return self._entries[key]
+        record_cache('timetable', False)
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+timetable_cache = TimetableCache()
+
+def timetable_page(kind, entity, load_schedules, render):
+    """Serve a personal timetable page with conditional-GET support.
+
+    The ETag covers (build, kind, entity, data versions, user and their
+    calendar token) and Last-Modified is the latest bump of TIMETABLE_SCOPES, so an
+    unchanged timetable is answered with 304 before anything is loaded or
+    rendered. Otherwise the
+    grid comes from the in-process cache and `load_schedules()` only runs
+    on a miss. `render(grid)` returns the page body.
+    """
+    versions, last_modified = data_state(*TIMETABLE_SCOPES)
+    etag = cache_key('timetable_page', build_id(), kind, entity, versions, current_user.get_id(),
+                     getattr(current_user, 'calendar_token', None))[:40]
+
+    # A pending flash message must be rendered, not answered from the browser's copy
+    if not session.get('_flashes') and not is_resource_modified(
+        request.environ, etag=etag, last_modified=last_modified
+    ):
+        response = make_response('', 304)
+    else:
+        grid = timetable_cache.get_or_build(
+            (kind, entity, versions),
+            lambda: TimetableGrid([snapshot(schedule) for schedule in load_schedules()]),
+            current_app.config['TIMETABLE_CACHE_SIZE']
+        )
+        response = make_response(render(grid))
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
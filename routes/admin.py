@@ -4,55 +4,46 @@ from flask_login import login_required, current_user
 from core.models import Department, Program, Teacher, Room, Course, Schedule, StudentGroup, User, db
 from datetime import date, datetime, timedelta
 from core.extensions import db, login_manager
-from core.utils import send_email
-from io import BytesIO
-from reportlab.lib.pagesizes import letter, landscape 
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.enums import TA_CENTER
+from core.database import read_replica
+from core.query_profile import query_budget, query_report
+from core.metrics import RENDER_SECONDS
+from core.utils import send_teacher_account_email, send_teacher_update_email
 from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import SQLAlchemyError
-import matplotlib.pyplot as plt
-import numpy as np
-import io
-import base64
 from patterns.decorators import role_required, role_required_api
 from patterns.repositories import UserRepository
 from patterns.factories import UserFactory
+from patterns.conflicts import schedule_index, overlaps, find_conflicting_pairs
+from patterns.timetable import load_problem, solve, save_solution
+from patterns.grid import DAYS, TIME_SLOTS, TimetableGrid
+from patterns.pdf_export import program_document, program_filename, pdf_response, faculty_documents, stream_pdf_bundle
+from patterns.statistics import CHART_SCOPES, workload_statistics
+from patterns.teacher_load import TeacherOverloadError
+from core.cache import build_id, cache_key, cached_artifact_response, current_versions, file_cache
 
 # Create a Blueprint named 'admin'
 admin_bp = Blueprint('admin', __name__)
 
 @admin_bp.route('/dashboard')
+@read_replica
 @role_required('admin')
+@query_budget(10)
 def admin_dashboard():
     """Tableau de bord administrateur."""
-    departments_count = Department.query.count()
-    teachers_count = Teacher.query.count()
-    rooms_count = Room.query.count()
-    schedules_count = Schedule.query.count()
-    recent_schedules = Schedule.query.order_by(Schedule.created_at.desc()).limit(5).all()
-
-    teachers = Teacher.query.all()
-    teacher_labels = [f"{t.first_name} {t.last_name}" for t in teachers]
-    teacher_hours = []
-    for teacher in teachers:
-        total_hours = 0
-        for schedule in teacher.schedules:
-            duration = (datetime.combine(datetime.today(), schedule.end_time) -
-                    datetime.combine(datetime.today(), schedule.start_time)).seconds / 3600
-            total_hours += duration
-        teacher_hours.append(round(total_hours, 2))
+    stats = workload_statistics()
+    recent_schedules = Schedule.query.options(
+        joinedload(Schedule.course),
+        joinedload(Schedule.teacher)
+    ).order_by(Schedule.created_at.desc()).limit(5).all()
 
     return render_template('admin/dashboard.html',
-                            departments_count=departments_count,
-                            teachers_count=teachers_count,
-                            rooms_count=rooms_count,
-                            schedules_count=schedules_count,
+                            departments_count=stats.departments_count,
+                            teachers_count=stats.teachers_count,
+                            rooms_count=stats.rooms_count,
+                            schedules_count=stats.schedules_count,
                             recent_schedules=recent_schedules,
-                            teacher_labels=teacher_labels,
-                            teacher_hours=teacher_hours)
+                            teacher_labels=stats.teacher_labels,
+                            teacher_hours=stats.teacher_hours)
 
 @admin_bp.route('/departments', methods=['GET', 'POST'])
 @role_required('admin')
@@ -210,11 +201,13 @@ def manage_teachers():
                 user_repo.add(user)
                 if teacher:
                     db.session.add(teacher)
+                if send_email_flag:
+                    # Queued in the same transaction, sent by the outbox worker after the commit
+                    send_teacher_account_email(email, username, password, first_name, last_name)
                 db.session.commit()
 
                 if send_email_flag:
-                    send_teacher_account_email(email, username, password, first_name, last_name)
-                    flash('Enseignant ajouté et email envoyé avec succès !', 'success')
+                    flash("Enseignant ajouté, l'email sera envoyé sous peu !", 'success')
                 else:
                     flash('Enseignant ajouté avec succès !', 'success')
 
@@ -256,11 +249,12 @@ def manage_teachers():
                 teacher.last_name = new_last_name
                 teacher.type = new_type
                 teacher.max_hours = new_max_hours
+                if send_email_flag and new_password:
+                    send_teacher_update_email(new_email, new_username, new_password, new_first_name, new_last_name)
                 db.session.commit()
 
                 if send_email_flag and new_password:
-                    send_teacher_update_email(new_email, new_username, new_password, new_first_name, new_last_name)
-                    flash('Enseignant modifié et email envoyé avec succès !', 'success')
+                    flash("Enseignant modifié, l'email sera envoyé sous peu !", 'success')
                 else:
                     flash('Enseignant modifié avec succès !', 'success')
 
@@ -270,46 +264,44 @@ def manage_teachers():
             
             return redirect(url_for('admin.manage_teachers'))
     
-    teachers = Teacher.query.all()
+    teachers = Teacher.query.options(joinedload(Teacher.user)).all()
     return render_template('admin/teachers.html', teachers=teachers)
 
-def send_teacher_account_email(email, username, password, first_name, last_name):
-    """Send email for new teacher account."""
-    subject = "Votre compte enseignant a été créé"
-    body = f"""
-    Bonjour {first_name} {last_name},
-    
-    Votre compte enseignant a été créé avec les informations suivantes :
-    
-    Identifiant: {username}
-    Mot de passe: {password}
-    Email: {email}
-    
-    Vous pouvez vous connecter à l'adresse: {url_for('auth.login', _external=True)}
-    
-    Cordialement,
-    L'administration
-    """
-    send_email(subject, [email], body)
-
-def send_teacher_update_email(email, username, password, first_name, last_name):
-    """Send email for updated teacher account."""
-    subject = "Votre compte enseignant a été mis à jour"
-    body = f"""
-    Bonjour {first_name} {last_name},
-    
-    Votre compte enseignant a été mis à jour avec les informations suivantes :
-    
-    Identifiant: {username}
-    Nouveau mot de passe: {password}
-    Email: {email}
-    
-    Vous pouvez vous connecter à l'adresse: {url_for('auth.login', _external=True)}
-    
-    Cordialement,
-    L'administration
-    """
-    send_email(subject, [email], body)
+@admin_bp.route('/teachers/import', methods=['POST'])
+@role_required('admin')
+def import_teachers():
+    """Import en masse d'enseignants (CSV ou XLSX)."""
+    # pandas is heavy: only load it when an import is actually requested
+    from patterns.teacher_import import read_teacher_file, import_teachers as run_import
+
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash('Aucun fichier fourni.', 'error')
+        return redirect(url_for('admin.manage_teachers'))
+
+    try:
+        frame = read_teacher_file(upload.stream, upload.filename)
+        report = run_import(
+            frame, current_app.config,
+            strict=request.form.get('strict') == 'true',
+            send_emails=request.form.get('send_email') == 'true',
+            workers=current_app.config['TEACHER_IMPORT_WORKERS']
+        )
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin.manage_teachers'))
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Database error in import_teachers: {str(e)}")
+        flash("Erreur de base de données lors de l'import.", 'error')
+        return redirect(url_for('admin.manage_teachers'))
+
+    current_app.logger.info(f"Teacher import: {report.inserted}/{report.total} rows inserted, {len(report.errors)} errors")
+    flash(f'{report.inserted} enseignant(s) importé(s) sur {report.total}.', 'success' if not report.errors else 'error')
+    for error in report.errors[:10]:
+        flash(f"Ligne {error['row']} [{error['field']}] : {error['message']}", 'error')
+    if len(report.errors) > 10:
+        flash(f'... et {len(report.errors) - 10} autre(s) erreur(s).', 'error')
+    return redirect(url_for('admin.manage_teachers'))
 
 @admin_bp.route('/teachers/delete/<int:teacher_id>', methods=['POST'])
 @role_required('admin')
@@ -438,7 +430,7 @@ def manage_courses():
             flash('Cours modifié avec succès !', 'success')
             return redirect(url_for('admin.manage_courses'))
     
-    programs = Program.query.all()
+    programs = Program.query.options(joinedload(Program.department)).all()
     teachers = Teacher.query.all()
     courses = Course.query.all()
     return render_template('admin/courses.html', programs=programs, teachers=teachers, courses=courses)
@@ -466,20 +458,29 @@ def check_schedule_conflicts(room_id, teacher_id, group_id, day, start_time_obj,
         'group': []
     }
 
-    conflict_query = Schedule.query.filter(
-        Schedule.day == day,
-        (
-            (Schedule.start_time <= start_time_obj) & (Schedule.end_time > start_time_obj) |
-            (Schedule.start_time < end_time_obj) & (Schedule.end_time >= end_time_obj) |
-            (Schedule.start_time >= start_time_obj) & (Schedule.end_time <= end_time_obj)
-        )
+    conflict_ids = schedule_index.find(
+        room_id, teacher_id, group_id, day, start_time_obj, end_time_obj,
+        exclude_id=exclude_schedule_id
     )
+    all_ids = set(conflict_ids['room']) | set(conflict_ids['teacher']) | set(conflict_ids['group'])
+    if not all_ids:
+        return conflicts
 
-    if exclude_schedule_id:
-        conflict_query = conflict_query.filter(Schedule.id != exclude_schedule_id)
-
-    room_conflicts = conflict_query.filter(Schedule.room_id == room_id).all()
-    for conflict in room_conflicts:
+    # Only load details (in one query) when there is something to report. The overlap is checked
+    # again on the loaded rows, so an id moved or deleted since the index lookup is dropped
+    rows = Schedule.query.options(
+        joinedload(Schedule.course),
+        joinedload(Schedule.teacher),
+        joinedload(Schedule.group),
+        joinedload(Schedule.room)
+    ).filter(Schedule.id.in_(all_ids), Schedule.day == day, overlaps(start_time_obj, end_time_obj)).all()
+    by_id = {row.id: row for row in rows}
+    resources = {'room': ('room_id', room_id), 'teacher': ('teacher_id', teacher_id), 'group': ('group_id', group_id)}
+    for kind, (column, value) in resources.items():
+        conflict_ids[kind] = [i for i in conflict_ids[kind]
+                              if i in by_id and getattr(by_id[i], column) == int(value)]
+
+    for conflict in (by_id[i] for i in conflict_ids['room'] if i in by_id):
         conflicts['room'].append({
             'type': 'room',
             'course': conflict.course.name,
@@ -488,8 +489,7 @@ def check_schedule_conflicts(room_id, teacher_id, group_id, day, start_time_obj,
             'time': f"{conflict.start_time.strftime('%H:%M')}-{conflict.end_time.strftime('%H:%M')}"
         })
 
-    teacher_conflicts = conflict_query.filter(Schedule.teacher_id == teacher_id).all()
-    for conflict in teacher_conflicts:
+    for conflict in (by_id[i] for i in conflict_ids['teacher'] if i in by_id):
         conflicts['teacher'].append({
             'type': 'teacher',
             'course': conflict.course.name,
@@ -498,24 +498,23 @@ def check_schedule_conflicts(room_id, teacher_id, group_id, day, start_time_obj,
             'time': f"{conflict.start_time.strftime('%H:%M')}-{conflict.end_time.strftime('%H:%M')}"
         })
 
-    if group_id:
-        group_conflicts = conflict_query.filter(Schedule.group_id == group_id).all()
-        for conflict in group_conflicts:
-            conflicts['group'].append({
-                'type': 'group',
-                'course': conflict.course.name,
-                'teacher': f"{conflict.teacher.first_name} {conflict.teacher.last_name}",
-                'room': conflict.room.name,
-                'time': f"{conflict.start_time.strftime('%H:%M')}-{conflict.end_time.strftime('%H:%M')}"
-            })
+    for conflict in (by_id[i] for i in conflict_ids['group'] if i in by_id):
+        conflicts['group'].append({
+            'type': 'group',
+            'course': conflict.course.name,
+            'teacher': f"{conflict.teacher.first_name} {conflict.teacher.last_name}",
+            'room': conflict.room.name,
+            'time': f"{conflict.start_time.strftime('%H:%M')}-{conflict.end_time.strftime('%H:%M')}"
+        })
 
     return conflicts
 
 @admin_bp.route('/schedule', methods=['GET', 'POST'])
 @role_required('admin')
+@query_budget(30)
 def manage_schedule():
     """Gestion des emplois du temps."""
-    programs = Program.query.all()
+    programs = Program.query.options(joinedload(Program.department)).all()
     courses = Course.query.all()
     teachers = Teacher.query.all()
     groups = StudentGroup.query.all()
@@ -593,6 +592,9 @@ def manage_schedule():
                 db.session.add(schedule)
                 db.session.commit()
                 flash('Créneau ajouté avec succès.', 'success')
+            except TeacherOverloadError as e:
+                db.session.rollback()
+                flash(str(e), 'error')
             except Exception as e:
                 db.session.rollback()
                 current_app.logger.error(f"Error adding schedule: {str(e)}")
@@ -612,6 +614,9 @@ def manage_schedule():
                 schedule.end_time = end_time_obj
                 db.session.commit()
                 flash('Créneau modifié avec succès.', 'success')
+            except TeacherOverloadError as e:
+                db.session.rollback()
+                flash(str(e), 'error')
             except Exception as e:
                 db.session.rollback()
                 current_app.logger.error(f"Error updating schedule: {str(e)}")
@@ -622,7 +627,7 @@ def manage_schedule():
     program_id = request.args.get('program_id')
     year = request.args.get('year')
 
-    query = Schedule.query.options(
+    eager = (
         joinedload(Schedule.program),
         joinedload(Schedule.course),
         joinedload(Schedule.teacher),
@@ -630,45 +635,41 @@ def manage_schedule():
         joinedload(Schedule.room)
     )
 
+    filters = []
     if program_id:
-        query = query.filter_by(program_id=program_id)
+        filters.append(Schedule.program_id == program_id)
     if year:
-        query = query.filter_by(year=year)
-
-    schedules = query.order_by(Schedule.day, Schedule.start_time).all()
-
-    for schedule in schedules:
-        conflicts = check_schedule_conflicts(
-            room_id=schedule.room_id,
-            teacher_id=schedule.teacher_id,
-            group_id=schedule.group_id,
-            day=schedule.day,
-            start_time_obj=schedule.start_time,
-            end_time_obj=schedule.end_time,
-            exclude_schedule_id=schedule.id
-        )
-        schedule.has_conflict = any(conflicts.values())
-
-    time_slots = [
-        ('08:30', '10:30'),
-        ('10:40', '12:40'),
-        ('13:00', '15:00'),
-        ('15:10', '17:10'),
-        ('17:20', '19:20')
+        filters.append(Schedule.year == year)
+
+    schedules = Schedule.query.options(*eager).filter(*filters).order_by(Schedule.day, Schedule.start_time).all()
+
+    # Rows outside the filter can still share a room, teacher or group with listed ones
+    related = []
+    if filters and schedules:
+        resource_filters = [
+            Schedule.room_id.in_({s.room_id for s in schedules}),
+            Schedule.teacher_id.in_({s.teacher_id for s in schedules})
+        ]
+        group_ids = {s.group_id for s in schedules if s.group_id is not None}
+        if group_ids:
+            resource_filters.append(Schedule.group_id.in_(group_ids))
+        related = Schedule.query.options(*eager).filter(
+            db.not_(db.and_(*filters)),
+            Schedule.day.in_({s.day for s in schedules}),
+            db.or_(*resource_filters)
+        ).all()
+
+    listed_ids = {s.id for s in schedules}
+    conflict_pairs = [
+        (kind, first, second)
+        for kind, first, second in find_conflicting_pairs(schedules + related)
+        if first.id in listed_ids or second.id in listed_ids
     ]
-    days = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi"]
-
-    schedule_grid = {day: {i: [] for i in range(len(time_slots))} for day in days}
-
+    conflicting_ids = {s.id for _kind, first, second in conflict_pairs for s in (first, second)}
     for schedule in schedules:
-        schedule_start = schedule.start_time.strftime('%H:%M')
-        schedule_end = schedule.end_time.strftime('%H:%M')
-        day = schedule.day
+        schedule.has_conflict = schedule.id in conflicting_ids
 
-        if day in days:
-            for slot_idx, (slot_start, slot_end) in enumerate(time_slots):
-                if schedule_start <= slot_end and schedule_end >= slot_start:
-                    schedule_grid[day][slot_idx].append(schedule)
+    schedule_grid = TimetableGrid(schedules)
 
     return render_template(
         'admin/schedule.html',
@@ -678,12 +679,82 @@ def manage_schedule():
         groups=groups,
         rooms=rooms,
         schedule_grid=schedule_grid,
-        days=days,
-        time_slots=time_slots,
+        days=DAYS,
+        time_slots=TIME_SLOTS,
         selected_program_id=program_id,
-        selected_year=year
+        selected_year=year,
+        conflict_pairs=conflict_pairs
     )
 
+@admin_bp.route('/schedule/generate', methods=['POST'])
+@role_required('admin')
+def generate_schedule():
+    """Génération automatique de l'emploi du temps d'une filière/année."""
+    program_id = request.form.get('program_id', type=int)
+    year = request.form.get('year', type=int)
+    time_budget = request.form.get('time_budget', current_app.config['TIMETABLE_TIME_BUDGET'], type=float)
+
+    if not program_id or not year:
+        flash('Veuillez sélectionner une filière et une année avant de générer.', 'error')
+        return redirect(url_for('admin.manage_schedule'))
+
+    problem = load_problem(program_id, year, weeks=current_app.config['SEMESTER_WEEKS'])
+    if not problem.events:
+        flash('Aucun cours à planifier pour cette filière.', 'error')
+        return redirect(url_for('admin.manage_schedule', program_id=program_id, year=year))
+
+    max_budget = current_app.config['TIMETABLE_MAX_REQUEST_BUDGET']
+    if time_budget > max_budget:
+        flash(f"Recherche limitée à {max_budget:g}s dans le navigateur ; pour une recherche plus longue, "
+              f"utilisez `flask generate-timetable --program {program_id} --year {year} --time-budget <s> --save`.",
+              'info')
+    result = solve(problem, time_budget=min(max(time_budget, 0.5), max_budget))
+    current_app.logger.info(f"Timetable generated for program {program_id}, year {year}: {result.to_dict()}")
+
+    if result.hard:
+        flash(f"Génération impossible : {result.hard} séance(s) sur {len(problem.events)} n'ont pas pu être placées "
+              f"(salles, enseignants ou heures max insuffisants).", 'error')
+        return redirect(url_for('admin.manage_schedule', program_id=program_id, year=year))
+
+    try:
+        save_solution(problem, result)
+        flash(f"Emploi du temps généré : {len(result.placements)} séances en {result.elapsed:.1f}s "
+              f"(pénalités : {result.soft}).", 'success')
+    except TeacherOverloadError as e:
+        db.session.rollback()
+        flash(str(e), 'error')
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error saving generated timetable: {str(e)}")
+        flash('Erreur lors de l\'enregistrement de l\'emploi du temps généré.', 'error')
+
+    return redirect(url_for('admin.manage_schedule', program_id=program_id, year=year))
+
+@admin_bp.route('/api/schedule/import', methods=['POST'])
+@role_required_api('admin')
+def import_schedule():
+    """Import en masse de créneaux (CSV, JSON ou XLSX)."""
+    # pandas is heavy: only load it when an import is actually requested
+    from patterns.schedule_import import read_schedule_file, import_schedules
+
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'status': 'error', 'message': 'Aucun fichier fourni.'}), 400
+
+    strict = request.form.get('strict') == 'true'
+    dry_run = request.form.get('dry_run') == 'true'
+    try:
+        frame = read_schedule_file(upload.stream, upload.filename)
+        report = import_schedules(frame, strict=strict, dry_run=dry_run)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Database error in import_schedule: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Database operation failed'}), 500
+
+    current_app.logger.info(f"Schedule import: {report.inserted}/{report.total} rows inserted, {len(report.errors)} errors")
+    return jsonify(report.to_dict()), (200 if not report.errors else 422)
+
 @admin_bp.route('/schedule/delete/<int:schedule_id>', methods=['POST'])
 @role_required('admin')
 def delete_schedule(schedule_id):
@@ -697,6 +768,7 @@ def delete_schedule(schedule_id):
     return redirect(url_for('admin.manage_schedule', program_id=program_id, year=year))
 
 @admin_bp.route('/export/schedule/pdf')
+@read_replica
 @role_required('admin')
 def export_schedule_pdf():
     """Exportation de l'emploi du temps en PDF."""
@@ -712,208 +784,75 @@ def export_schedule_pdf():
         flash('Filière non trouvée.', 'error')
         return redirect(url_for('admin.manage_schedule'))
 
-    program_name = program.name
-    year_text = f"{year}ère année" if year == '1' else f"{year}ème année"
-
+    def build_document():
+        schedules = Schedule.query.options(
+            joinedload(Schedule.group),
+            joinedload(Schedule.course),
+            joinedload(Schedule.teacher),
+            joinedload(Schedule.room),
+            joinedload(Schedule.program)
+        ).filter(
+            Schedule.program_id == program_id,
+            Schedule.year == year
+        ).order_by(
+            Schedule.day,
+            Schedule.start_time
+        ).all()
+        return program_document(program, year, schedules)
+
+    return pdf_response('program', (program.id, str(year)), program_filename(program, year), build_document)
+
+@admin_bp.route('/export/all/zip')
+@read_replica
+@role_required('admin')
+def export_all_pdf():
+    """Exportation de tous les emplois du temps (filières, groupes, enseignants) en ZIP."""
+    # Everything is loaded up front; the worker processes only render
     schedules = Schedule.query.options(
         joinedload(Schedule.group),
         joinedload(Schedule.course),
         joinedload(Schedule.teacher),
         joinedload(Schedule.room),
         joinedload(Schedule.program)
-    ).filter(
-        Schedule.program_id == program_id,
-        Schedule.year == year
-    ).order_by(
-        Schedule.day,
-        Schedule.start_time
-    ).all()
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=landscape(letter),
-        leftMargin=72,
-        rightMargin=72,
-        topMargin=36,
-        bottomMargin=36
-    )
-    
-    elements = []
-    styles = getSampleStyleSheet()
-    styles['Title'].alignment = TA_CENTER
-    styles['Heading1'].alignment = TA_CENTER
-    
-    cell_style = styles['Normal'].clone('CellStyle')
-    cell_style.fontSize = 8
-    cell_style.leading = 10
-    cell_style.alignment = TA_CENTER
-    
-    title = Paragraph(f"<b>Emploi du Temps - {program_name} ({year_text})</b>", styles['Title'])
-    elements.append(title)
-    elements.append(Spacer(1, 12))
-
-    days = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi"]
-    time_slots = [
-        ("08:30", "10:30"),
-        ("10:40", "12:40"),
-        ("13:00", "15:00"),
-        ("15:10", "17:10"),
-        ("17:20", "19:20")
-    ]
+    ).order_by(Schedule.day, Schedule.start_time).all()
+    teachers = Teacher.query.options(joinedload(Teacher.load)).order_by(Teacher.last_name, Teacher.first_name).all()
+    groups = StudentGroup.query.order_by(StudentGroup.name).all()
 
-    data = []
-    header = ["Jour/Horaire"] + [f"{start}-{end}" for start, end in time_slots]
-    data.append(header)
-    
-    for day in days:
-        row = [day]
-        for start_time_str, end_time_str in time_slots:
-            matching_schedules = [
-                s for s in schedules 
-                if s.day == day 
-                and s.start_time.strftime('%H:%M') <= start_time_str
-                and s.end_time.strftime('%H:%M') >= end_time_str
-            ]
-            
-            if matching_schedules:
-                s = matching_schedules[0]
-                cell_content = [
-                    f"<b>{s.course.name}</b> ({s.course.type})",
-                    f"Pr. {s.teacher.last_name}",
-                    f"Groupe: {s.group.name if s.group else 'Tous'}",
-                    f"Salle: {s.room.name}"
-                ]
-                cell_text = "<br/>".join(cell_content)
-                row.append(Paragraph(cell_text, cell_style))
-            else:
-                row.append("")
-        data.append(row)
-
-    table = Table(data, 
-                 colWidths=[100] + [120] * len(time_slots),
-                 repeatRows=1)
-    
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3B82F6')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
-    elements.append(table)
-    elements.append(Spacer(1, 12))
-    
-    doc.build(elements)
-    
-    buffer.seek(0)
+    documents = faculty_documents(schedules, teachers, groups)
+    workers = current_app.config['PDF_EXPORT_WORKERS']
     return Response(
-        buffer.getvalue(),
-        mimetype='application/pdf',
+        stream_pdf_bundle(documents, workers=workers),
+        mimetype='application/zip',
         headers={
-            'Content-Disposition': f'attachment; filename=emploi_du_temps_{program_name}_{year_text}.pdf'
+            'Content-Disposition': f'attachment; filename=emplois_du_temps_{date.today().isoformat()}.zip'
         }
     )
 
 @admin_bp.route('/teacher_chart')
+@read_replica
 @role_required_api('admin')
 def teacher_chart():
-    """Génération du graphique des heures par enseignant."""
+    """Données du graphique des heures par enseignant (l'image est servie séparément)."""
     try:
-        teachers = Teacher.query.options(db.joinedload(Teacher.schedules)).all()
-        
-        if not teachers:
+        versions = current_versions(*CHART_SCOPES)
+        etag = cache_key('teacher_chart', 'json', build_id(), versions)[:40]
+        if etag in request.if_none_match:
+            response = Response(status=304, headers={'Cache-Control': 'private, no-cache'})
+            response.set_etag(etag)
+            return response
+
+        labels, hours = workload_statistics().ranked()
+        if not labels:
             current_app.logger.info("No teachers found for chart data")
-            return jsonify({'status': 'success', 'image': ''})
-
-        labels = []
-        hours = []
-        
-        for teacher in teachers:
-            total_hours = 0.0
-            schedule_count = len(teacher.schedules)
-            current_app.logger.info(f"Processing teacher {teacher.first_name} {teacher.last_name} with {schedule_count} schedules")
-            
-            for schedule in teacher.schedules:
-                try:
-                    if not schedule.start_time or not schedule.end_time:
-                        current_app.logger.warning(f"Schedule {schedule.id} missing start_time or end_time")
-                        continue
-                        
-                    start = schedule.start_time
-                    end = schedule.end_time
-                    
-                    if isinstance(start, str):
-                        try:
-                            start = datetime.strptime(start, '%H:%M:%S').time()
-                        except ValueError as e:
-                            current_app.logger.error(f"Invalid start_time format for schedule {schedule.id}: {start}, error: {str(e)}")
-                            continue
-                    if isinstance(end, str):
-                        try:
-                            end = datetime.strptime(end, '%H:%M:%S').time()
-                        except ValueError as e:
-                            continue
-                            
-                    start_dt = datetime.combine(date.today(), start)
-                    end_dt = datetime.combine(date.today(), end)
-                    
-                    if end < start:
-                        end_dt = datetime.combine(date.today() + timedelta(days=1), end)
-                    
-                    duration = (end_dt - start_dt).total_seconds() / 3600
-                    if duration < 0:
-                        current_app.logger.error(f"Negative duration for schedule {schedule.id}: start={start}, end={end}")
-                        continue
-                        
-                    total_hours += duration
-                    current_app.logger.debug(f"Schedule {schedule.id} duration: {duration:.2f} hours")
-                except Exception as e:
-                    current_app.logger.error(f"Error processing schedule {schedule.id}: {str(e)}")
-                    continue
-
-            labels.append(f"{teacher.first_name} {teacher.last_name}")
-            hours.append(round(total_hours, 2))
-            current_app.logger.info(f"Teacher {teacher.first_name} {teacher.last_name} total hours: {total_hours:.2f}")
-
-        sorted_indices = np.argsort(hours)[::-1]
-        labels = [labels[i] for i in sorted_indices]
-        hours = [hours[i] for i in sorted_indices]
-
-        fig, ax = plt.subplots(figsize=(10, 6))
-        x = np.arange(len(labels))
-        bars = ax.bar(x, hours, color='#1e88e5', edgecolor='black')
-        
-        ax.set_xlabel('Enseignants', fontsize=12)
-        ax.set_ylabel('Heures', fontsize=12)
-        ax.set_title('Heures par Enseignant', fontsize=14)
-        ax.set_xticks(x)
-        ax.set_xticklabels(labels, rotation=45, ha='right', fontsize=10)
-        ax.grid(True, axis='y', linestyle='--', alpha=0.7)
-        
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{height:.2f}h',
-                    ha='center', va='bottom', fontsize=9)
-        
-        plt.tight_layout()
-
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100)
-        buf.seek(0)
-        image_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-        buf.close()
-        plt.close(fig)
-
-        return jsonify({
+        response = jsonify({
             'status': 'success',
-            'image': f'data:image/png;base64,{image_base64}'
+            'labels': labels,
+            'hours': hours,
+            'image': url_for('admin.teacher_chart_image', image_format='png', v=etag[:12]) if labels else ''
         })
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.set_etag(etag)
+        return response
 
     except SQLAlchemyError as e:
         current_app.logger.error(f"Database error in teacher_chart: {str(e)}")
@@ -922,11 +861,33 @@ def teacher_chart():
             'message': 'Database operation failed',
             'error': str(e)
         }), 500
-        
-    except Exception as e:
-        current_app.logger.error(f"Unexpected error in teacher_chart: {str(e)}")
-        return jsonify({
-            'status': 'error',
-            'message': 'An unexpected error occurred',
-            'error': str(e)
-        }), 500
\ No newline at end of file
+
+@admin_bp.route('/teacher_chart.<any(png, svg):image_format>')
+@read_replica
+@role_required_api('admin')
+def teacher_chart_image(image_format):
+    """Graphique des heures par enseignant, rendu une fois par version des données."""
+    key = cache_key('teacher_chart', image_format, current_versions(*CHART_SCOPES))
+    mimetype = 'image/png' if image_format == 'png' else 'image/svg+xml'
+    return cached_artifact_response(
+        file_cache('CHART'), key, mimetype,
+        lambda: _render_teacher_chart(image_format)
+    )
+
+def _render_teacher_chart(image_format):
+    from patterns.chart_render import render_teacher_chart
+    with RENDER_SECONDS.labels('chart').time():
+        return render_teacher_chart(*workload_statistics().ranked(), image_format=image_format)
+
+@admin_bp.route('/sql-report', methods=['GET', 'POST'])
+@role_required('admin')
+def sql_report():
+    """Requêtes SQL par endpoint depuis le démarrage de ce processus (POST : remise à zéro)."""
+    if request.method == 'POST':
+        query_report.reset()
+        flash('Rapport SQL remis à zéro.', 'success')
+        return redirect(url_for('admin.sql_report'))
+    return render_template('admin/sql_report.html', endpoints=query_report.snapshot(),
+                           since=datetime.fromtimestamp(query_report.since),
+                           profiling=current_app.config['SQL_PROFILE'],
+                           threshold=current_app.config['SQL_REPEAT_THRESHOLD'])
@@ -0,0 +1,87 @@
+# routes/api.py
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy.exc import SQLAlchemyError
+
+from core.database import read_replica
+from core.models import Course, Program, Room, Schedule, StudentGroup, Teacher
+from patterns.api import ApiError, ApiResource, keyset_page
+from patterns.decorators import role_required_api
+from patterns.grid import DAYS
+
+# Create a Blueprint named 'api' (mounted under /api/v1)
+api_bp = Blueprint('api', __name__)
+
+def _day(value):
+    if value not in DAYS:
+        raise ValueError(value)
+    return value
+
+PROGRAM = ApiResource(Program, ['id', 'name', 'year'])
+TEACHER = ApiResource(Teacher, ['id', 'first_name', 'last_name', 'type', 'max_hours'], filters={'type': ('type', str)})
+ROOM = ApiResource(Room, ['id', 'name', 'capacity', 'type'], filters={'type': ('type', str)})
+GROUP = ApiResource(
+    StudentGroup, ['id', 'name', 'program_id', 'size'],
+    relations={'program': ('program', 'program_id', PROGRAM)},
+    filters={'program_id': ('program_id', int)}
+)
+COURSE = ApiResource(
+    Course, ['id', 'name', 'code', 'type', 'duration', 'program_id', 'teacher_id'],
+    relations={'program': ('program', 'program_id', PROGRAM), 'teacher': ('teacher', 'teacher_id', TEACHER)},
+    filters={'program_id': ('program_id', int), 'teacher_id': ('teacher_id', int), 'type': ('type', str)}
+)
+SCHEDULE = ApiResource(
+    Schedule,
+    ['id', 'program_id', 'year', 'course_id', 'teacher_id', 'group_id', 'room_id', 'day', 'start_time', 'end_time'],
+    relations={
+        'program': ('program', 'program_id', PROGRAM),
+        'course': ('course', 'course_id', COURSE),
+        'teacher': ('teacher', 'teacher_id', TEACHER),
+        'group': ('group', 'group_id', GROUP),
+        'room': ('room', 'room_id', ROOM)
+    },
+    filters={
+        'program_id': ('program_id', int),
+        'year': ('year', int),
+        'day': ('day', _day),
+        'teacher_id': ('teacher_id', int),
+        'room_id': ('room_id', int),
+        'group_id': ('group_id', int)
+    }
+)
+
+RESOURCES = {
+    'schedules': SCHEDULE,
+    'courses': COURSE,
+    'teachers': TEACHER,
+    'rooms': ROOM,
+    'groups': GROUP
+}
+
+@api_bp.route('/<any(schedules, courses, teachers, rooms, groups):name>')
+@read_replica
+@role_required_api('admin')
+def list_resource(name):
+    """Liste paginée par curseur : ?limit=&cursor=&fields=&<filtres>."""
+    page = keyset_page(RESOURCES[name], request.args, current_app.config['API_MAX_PAGE_SIZE'])
+    return jsonify(dict(page, status='success'))
+
+@api_bp.route('/<any(schedules, courses, teachers, rooms, groups):name>/<int:item_id>')
+@read_replica
+@role_required_api('admin')
+def get_resource(name, item_id):
+    """Un élément, avec les mêmes champs sélectionnables que la liste."""
+    resource = RESOURCES[name]
+    columns, related = resource.parse_fields(request.args.get('fields'))
+    item = resource.query(columns, related).filter(resource.model.id == item_id).first()
+    if item is None:
+        return jsonify({'status': 'error', 'message': 'Élément introuvable.'}), 404
+    return jsonify({'status': 'success', 'data': resource.serialize(item, columns, related)})
+
+@api_bp.errorhandler(ApiError)
+def api_error(e):
+    return jsonify({'status': 'error', 'message': str(e)}), 400
+
+@api_bp.errorhandler(SQLAlchemyError)
+def api_database_error(e):
+    current_app.logger.error(f"Database error in API: {str(e)}")
+    return jsonify({'status': 'error', 'message': 'Database operation failed'}), 500
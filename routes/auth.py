@@ -1,8 +1,11 @@
 # routes/auth.py
 from flask import render_template, request, flash, redirect, url_for, session, Blueprint, Response
-from flask_login import login_user, logout_user, login_required
-from core.models import User, Program
+from flask_login import login_user, logout_user, login_required, current_user
+from core.models import User, Program, StudentGroup
 from core.extensions import db, login_manager
+from core.database import read_replica
+from core.security import LoginBusyError
+from core.identity import current_user_record
 from patterns.factories import UserFactory
 from patterns.repositories import UserRepository
 from patterns.strategies import RedirectContext
@@ -18,7 +21,16 @@ def login():
         password = request.form['password']
         user_repo = UserRepository()
         user = user_repo.get_by_username(username)
-        if user and user.check_password(password):
+        try:
+            authenticated = user is not None and user.check_password(password)
+        except LoginBusyError:
+            flash('Le serveur est très sollicité, veuillez réessayer dans un instant.', 'error')
+            return render_template('auth/login.html'), 503
+        if authenticated:
+            if user.password_needs_rehash():
+                # Upgrade the stored hash to the configured parameters while the password is known
+                user.set_password(password)
+                db.session.commit()
             login_user(user)
             flash('Connexion réussie !', 'success')
             redirect_context = RedirectContext()
@@ -43,6 +55,7 @@ def logout():
     return response
 
 @auth_bp.route('/register', methods=['GET', 'POST'])
+@read_replica
 def register():
     """Inscription des nouveaux utilisateurs."""
     user_repo = UserRepository()
@@ -54,6 +67,7 @@ def register():
         role = request.form['role']
         program_id = request.form.get('program')  # Pour les étudiants
         year = request.form.get('year')  # Pour les étudiants
+        group_id = request.form.get('group')  # Pour les étudiants (optionnel)
         first_name = request.form.get('first_name')  # Pour les enseignants
         last_name = request.form.get('last_name')  # Pour les enseignants
         teacher_type = request.form.get('type')  # Pour les enseignants
@@ -82,7 +96,8 @@ def register():
                 first_name=first_name,
                 last_name=last_name,
                 teacher_type=teacher_type,
-                max_hours=max_hours
+                max_hours=max_hours,
+                group_id=group_id
             )
             user_repo.add(user)
             if teacher:
@@ -95,4 +110,23 @@ def register():
             return redirect(url_for('auth.register'))
     
     programs = Program.query.all()
-    return render_template('auth/register.html', programs=programs)
\ No newline at end of file
+    groups = StudentGroup.query.order_by(StudentGroup.name).all()
+    return render_template('auth/register.html', programs=programs, groups=groups)
+
+@auth_bp.route('/calendar/enable', methods=['POST'])
+@login_required
+def enable_calendar_feed():
+    """Crée le lien d'abonnement au calendrier de l'utilisateur s'il n'en a pas encore."""
+    current_user_record().calendar_feed_token()
+    db.session.commit()
+    flash("Lien d'abonnement au calendrier activé.", 'success')
+    return redirect(RedirectContext().get_redirect(current_user.role))
+
+@auth_bp.route('/calendar/reset', methods=['POST'])
+@login_required
+def reset_calendar_token():
+    """Remplace le lien d'abonnement au calendrier (l'ancien cesse de fonctionner)."""
+    current_user_record().calendar_feed_token(renew=True)
+    db.session.commit()
+    flash("Nouveau lien d'abonnement au calendrier généré.", 'success')
+    return redirect(RedirectContext().get_redirect(current_user.role))
@@ -0,0 +1,48 @@
+# conftest.py
+import pytest
+
+from app import create_app
+from core.extensions import db
+from core.identity import identity_cache
+from patterns.conflicts import schedule_index
+from patterns.statistics import clear_statistics_cache
+from patterns.timetable_cache import timetable_cache
+
+def _reset_process_caches():
+    # Per-process caches outlive an app; a fresh database must not be served from them
+    schedule_index.invalidate()
+    identity_cache.clear()
+    timetable_cache.clear()
+    clear_statistics_cache()
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Build apps on SQLite files under tmp_path; extra config keys override the defaults."""
+    apps = []
+
+    def build(**config):
+        settings = {
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'primary.db'}",
+            'OUTBOX_WORKER_THREAD': False,
+            'PDF_CACHE_DIR': str(tmp_path / 'pdf_cache'),
+            'CHART_CACHE_DIR': str(tmp_path / 'chart_cache'),
+            'CALENDAR_CACHE_DIR': str(tmp_path / 'calendar_cache'),
+        }
+        settings.update(config)
+        _reset_process_caches()
+        app = create_app(settings)
+        apps.append(app)
+        return app
+
+    yield build
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+    _reset_process_caches()
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
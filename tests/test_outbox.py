@@ -0,0 +1,169 @@
+# test_outbox.py
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from core.extensions import db
+from core.models import OutboxMessage
+from patterns.outbox import _claim_batch, deliver_pending, queue_email
+
+class RecordingHandler:
+    """aiosmtpd handler keeping what the outbox sent, one entry per SMTP connection.
+
+    Recipients in `refused` are answered 550 at RCPT TO, and once
+    `drop_after` messages were accepted the server hangs up at the next
+    MAIL FROM, as a server going away mid batch would.
+    """
+    def __init__(self):
+        self.connections = []  # per connection: list of the recipient lists of its messages
+        self.refused = set()
+        self.drop_after = None
+
+    def _messages(self, session):
+        if not self.connections or self.connections[-1][0] is not session:
+            self.connections.append((session, []))
+        return self.connections[-1][1]
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        session.host_name = hostname
+        self._messages(session)
+        return responses
+
+    async def handle_MAIL(self, server, session, envelope, address, mail_options):
+        if self.drop_after is not None and len(self.received()) >= self.drop_after:
+            server.transport.close()
+            return '421 Service not available'
+        envelope.mail_from = address
+        return '250 OK'
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refused:
+            return '550 No such user'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self._messages(session).append(list(envelope.rcpt_tos))
+        return '250 Message accepted'
+
+    def per_connection(self):
+        return [messages for _session, messages in self.connections]
+
+    def received(self):
+        return [recipients for messages in self.per_connection() for recipients in messages]
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=_free_port())
+    controller.start()
+    yield controller
+    controller.stop()
+
+@pytest.fixture
+def outbox_app(make_app, smtp_server):
+    app = make_app(MAIL_SERVER=smtp_server.hostname, MAIL_PORT=smtp_server.port, MAIL_USE_TLS=False,
+                   MAIL_USERNAME=None, MAIL_PASSWORD=None, MAIL_SUPPRESS_SEND=False,
+                   OUTBOX_BATCH_SIZE=3, OUTBOX_MAX_ATTEMPTS=4, OUTBOX_RETRY_DELAY=60,
+                   OUTBOX_RETRY_MAX_DELAY=150, OUTBOX_LEASE_SECONDS=300)
+    with app.app_context():
+        OutboxMessage.query.delete()
+        db.session.commit()
+        yield app
+
+@pytest.fixture
+def smtp(smtp_server):
+    return smtp_server.handler
+
+def queue(*addresses):
+    messages = [queue_email('Emploi du temps', [address], 'Bonjour') for address in addresses]
+    db.session.commit()
+    return [message.id for message in messages]
+
+def make_due(message_id):
+    """Move a message's retry time (or lease end) into the past."""
+    db.session.get(OutboxMessage, message_id).next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+def test_each_batch_is_sent_over_one_connection(outbox_app, smtp):
+    queue(*(f'user{n}@example.com' for n in range(5)))
+
+    assert deliver_pending() == 3
+    assert deliver_pending() == 2
+    assert deliver_pending() == 0  # nothing due: no connection opened
+
+    assert smtp.per_connection() == [
+        [['user0@example.com'], ['user1@example.com'], ['user2@example.com']],
+        [['user3@example.com'], ['user4@example.com']],
+    ]
+    messages = OutboxMessage.query.all()
+    assert {m.status for m in messages} == {'sent'}
+    assert all(m.body == '' and m.claimed_by is None for m in messages)
+
+def test_refused_message_is_retried_with_backoff_then_failed(outbox_app, smtp):
+    [message_id] = queue('nobody@example.com')
+    smtp.refused.add('nobody@example.com')
+
+    for attempts, delay in ((1, 60), (2, 120), (3, 150)):
+        before = datetime.utcnow()
+        assert deliver_pending() == 1
+        after = datetime.utcnow()
+        message = db.session.get(OutboxMessage, message_id)
+        assert (message.status, message.attempts, message.claimed_by) == ('pending', attempts, None)
+        assert '550' in message.last_error
+        assert before + timedelta(seconds=delay) <= message.next_attempt_at <= after + timedelta(seconds=delay)
+        assert deliver_pending() == 0  # not due before its retry time
+        make_due(message_id)
+
+    assert deliver_pending() == 1
+    message = db.session.get(OutboxMessage, message_id)
+    assert (message.status, message.attempts) == ('failed', 4)
+    assert deliver_pending() == 0
+    assert smtp.received() == []
+    assert len(smtp.connections) == 4
+
+def test_dropped_connection_charges_one_attempt_and_delays_the_rest(outbox_app, smtp):
+    first, second, third = queue('a@example.com', 'b@example.com', 'c@example.com')
+    smtp.drop_after = 1
+
+    before = datetime.utcnow()
+    assert deliver_pending() == 3
+    after = datetime.utcnow()
+    messages = {m.id: m for m in OutboxMessage.query}
+    assert messages[first].status == 'sent'
+    assert (messages[second].status, messages[second].attempts) == ('pending', 1)
+    assert (messages[third].status, messages[third].attempts) == ('pending', 0)
+    for message_id in (second, third):
+        assert before + timedelta(seconds=60) <= messages[message_id].next_attempt_at <= after + timedelta(seconds=60)
+
+    smtp.drop_after = None
+    make_due(second)
+    make_due(third)
+    assert deliver_pending() == 2
+    assert smtp.per_connection() == [[['a@example.com']], [['b@example.com'], ['c@example.com']]]
+
+def test_message_of_an_expired_lease_is_sent_exactly_once(outbox_app, smtp):
+    [message_id] = queue('late@example.com')
+    # A worker claims the batch, then dies before sending anything
+    [claimed] = _claim_batch(datetime.utcnow(), outbox_app.config)
+    assert claimed.status == 'sending'
+
+    assert deliver_pending() == 0  # still leased to the dead worker
+    assert smtp.connections == []
+
+    make_due(message_id)  # the lease runs out
+    assert deliver_pending() == 1
+    assert deliver_pending() == 0
+    # A claim racing with the same clock reading finds nothing left to take
+    assert _claim_batch(datetime.utcnow() - timedelta(seconds=1), outbox_app.config) == []
+
+    assert smtp.received() == [['late@example.com']]
+    message = db.session.get(OutboxMessage, message_id)
+    assert (message.status, message.attempts, message.claimed_by) == ('sent', 0, None)
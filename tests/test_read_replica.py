@@ -0,0 +1,100 @@
+# test_read_replica.py
+import shutil
+
+import pytest
+from sqlalchemy import event, insert
+
+from core.extensions import db
+from core.models import Room
+
+@pytest.fixture
+def replica_app(make_app, tmp_path):
+    """App whose replica is a copy of the primary, then seeded with a room of its own.
+
+    The replica is never updated afterwards, so a room name in a response
+    tells which database answered.
+    """
+    seed = make_app()  # creates and seeds primary.db
+    with seed.app_context():
+        db.engine.dispose()
+    shutil.copy(tmp_path / 'primary.db', tmp_path / 'replica.db')
+    app = make_app(SQLALCHEMY_REPLICA_URI=f"sqlite:///{tmp_path / 'replica.db'}")
+    with app.app_context():
+        db.session.add(Room(name='Salle primaire', capacity=30, type='TD'))
+        db.session.commit()
+        with db.engines['replica'].begin() as connection:
+            connection.execute(insert(Room), {'name': 'Salle réplique', 'capacity': 30, 'type': 'TD'})
+    return app
+
+@pytest.fixture
+def statements(replica_app):
+    """Statement kinds ('SELECT', 'INSERT', ...) sent to each engine, keyed 'primary' and 'replica'."""
+    sent = {'primary': [], 'replica': []}
+    with replica_app.app_context():
+        engines = {'primary': db.engine, 'replica': db.engines['replica']}
+    listeners = []
+    for name, engine in engines.items():
+        def record(conn, cursor, statement, parameters, context, executemany, name=name):
+            sent[name].append(statement.split()[0].upper())
+        event.listen(engine, 'before_cursor_execute', record)
+        listeners.append((engine, record))
+    yield sent
+    for engine, record in listeners:
+        event.remove(engine, 'before_cursor_execute', record)
+
+def admin_client(app):
+    client = app.test_client()
+    assert client.post('/login', data={'username': 'admin', 'password': 'admin123'}).status_code == 302
+    with client.session_transaction() as session:
+        session.pop('_primary_until', None)  # logging in may have written (password rehash)
+    # Fill the identity cache: the logged-in user is always loaded from the primary (core.identity)
+    client.get('/api/v1/rooms')
+    return client
+
+def room_names(client):
+    response = client.get('/api/v1/rooms?limit=200&fields=name')
+    assert response.status_code == 200
+    return {room['name'] for room in response.json['data']}
+
+def clear(sent):
+    for kinds in sent.values():
+        kinds.clear()
+
+def test_read_replica_view_reads_the_replica(replica_app, statements):
+    client = admin_client(replica_app)
+    clear(statements)
+
+    names = room_names(client)
+
+    assert 'Salle réplique' in names and 'Salle primaire' not in names
+    assert 'SELECT' in statements['replica']
+    assert statements['primary'] == []
+
+def test_writes_and_the_reads_after_them_use_the_primary(replica_app, statements):
+    client = admin_client(replica_app)
+    clear(statements)
+
+    response = client.post('/admin/rooms', data={'_method': 'POST', 'name': 'Salle neuve', 'capacity': '20',
+                                                 'type': 'Amphi'})
+    assert response.status_code == 302
+    assert 'INSERT' in statements['primary']
+    assert statements['replica'] == []
+    with replica_app.app_context():
+        assert Room.query.filter_by(name='Salle neuve').count() == 1
+        with db.engines['replica'].connect() as connection:
+            assert connection.execute(Room.__table__.select().where(Room.name == 'Salle neuve')).first() is None
+
+    # Read-your-writes: for READ_REPLICA_STICKY_SECONDS this browser reads the primary
+    clear(statements)
+    names = room_names(client)
+    assert {'Salle neuve', 'Salle primaire'} <= names and 'Salle réplique' not in names
+    assert 'SELECT' in statements['primary']
+    assert statements['replica'] == []
+
+    # Once the window is over, the replica answers again
+    with client.session_transaction() as session:
+        session['_primary_until'] = 0
+    clear(statements)
+    names = room_names(client)
+    assert 'Salle réplique' in names and 'Salle neuve' not in names
+    assert statements['primary'] == []
@@ -0,0 +1,31 @@
+# test_schema.py
+from datetime import time
+
+import pytest
+from sqlalchemy import select
+
+from core.extensions import db
+from core.models import Schedule
+from core.schema import plan_indexes
+from patterns.conflicts import overlaps
+
+START, END = time(8, 30), time(10, 30)
+
+@pytest.mark.parametrize('column, index', [
+    (Schedule.room_id, 'ix_schedule_day_room_start'),
+    (Schedule.teacher_id, 'ix_schedule_day_teacher_start'),
+    (Schedule.group_id, 'ix_schedule_day_group_start'),
+])
+def test_overlap_query_uses_day_resource_index(app, column, index):
+    statement = select(Schedule.id).where(Schedule.day == 'Lundi', column == 1, overlaps(START, END))
+    with app.app_context():
+        lines, indexes = plan_indexes(db.session, statement)
+    assert index in indexes, lines
+    # The start_time range is part of the index search, not a filter applied after it
+    assert any(index in line and 'start_time<' in line for line in lines), lines
+
+def test_timetable_query_uses_program_year_index(app):
+    statement = select(Schedule.id).where(Schedule.program_id == 1, Schedule.year == 1)
+    with app.app_context():
+        lines, indexes = plan_indexes(db.session, statement)
+    assert 'ix_schedule_program_year_group' in indexes, lines
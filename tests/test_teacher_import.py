@@ -0,0 +1,37 @@
+# test_teacher_import.py
+import io
+
+from werkzeug.security import check_password_hash
+
+import patterns.teacher_import as teacher_import
+from core.models import Teacher, User
+
+def test_import_route_hashes_passwords_in_clean_worker_processes(make_app, monkeypatch):
+    contexts = []
+
+    class RecordingPool(teacher_import.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            contexts.append(kwargs.get('mp_context'))
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(teacher_import, 'ProcessPoolExecutor', RecordingPool)
+    app = make_app(TEACHER_IMPORT_WORKERS=2, PASSWORD_HASH_METHOD='pbkdf2:sha256:1000')
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+    rows = ['username,email,first_name,last_name,password,type,max_hours'] + [
+        f'prof{n},prof{n}@example.com,Prénom{n},Nom{n},secret{n},Permanent,12' for n in range(6)
+    ]
+    response = client.post('/admin/teachers/import', data={
+        'file': (io.BytesIO('\n'.join(rows).encode('utf-8')), 'enseignants.csv'),
+        'send_email': 'false'
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 302
+    assert len(contexts) == 1
+    assert contexts[0] is not None and contexts[0].get_start_method() in ('forkserver', 'spawn')
+    with app.app_context():
+        users = {user.username: user for user in User.query.filter(User.username.like('prof%'))}
+        assert len(users) == 6
+        assert all(check_password_hash(users[f'prof{n}'].password_hash, f'secret{n}') for n in range(6))
+        assert Teacher.query.filter(Teacher.user_id.in_([user.id for user in users.values()])).count() == 6
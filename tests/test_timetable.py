@@ -0,0 +1,49 @@
+# test_timetable.py
+from datetime import datetime
+
+from core.extensions import db
+from core.models import Course, Program, Room, Schedule, StudentGroup, Teacher, User
+from patterns.conflicts import find_conflicting_pairs
+from patterns.grid import DAYS, TIME_SLOTS
+from patterns.timetable import load_problem, save_solution, slot_day, slot_period, solve
+
+def _time(value):
+    return datetime.strptime(value, '%H:%M').time()
+
+def test_groups_busy_in_another_year_are_left_free(app):
+    with app.app_context():
+        program = Program.query.first()
+        group = StudentGroup.query.filter_by(program_id=program.id).order_by(StudentGroup.id).first()
+        user = User(username='autre', email='autre@example.com', role='teacher')
+        user.set_password('autre')
+        other_teacher = Teacher(user=user, first_name='Autre', last_name='Prof', type='Permanent', max_hours=100)
+        amphi = Room(name='Amphi A', capacity=200, type='Amphi')
+        other_room = Room(name='Salle B', capacity=40, type='Salle TD')
+        db.session.add_all([user, other_teacher, amphi, other_room, Room(name='Salle TD A', capacity=40, type='Salle TD')])
+        db.session.flush()
+        course = Course.query.filter_by(program_id=program.id).first()
+        db.session.add(Course(name='Exercices', code='EXO101', type='TD', duration=30, program_id=program.id,
+                              teacher_id=course.teacher_id))
+        # The group is taken by the second year everywhere but the two first slots of Monday
+        free = {0, 1}
+        for slot in range(len(DAYS) * len(TIME_SLOTS)):
+            if slot in free:
+                continue
+            start, end = TIME_SLOTS[slot_period(slot)]
+            db.session.add(Schedule(program_id=program.id, year=program.year + 1, course_id=course.id,
+                                    teacher_id=other_teacher.id, room_id=other_room.id, group_id=group.id,
+                                    day=DAYS[slot_day(slot)], start_time=_time(start), end_time=_time(end)))
+        db.session.commit()
+
+        problem = load_problem(program.id, program.year)
+        assert {(group.id, slot) for slot in range(len(DAYS) * len(TIME_SLOTS)) if slot not in free} \
+            <= problem.blocked_groups
+        result = solve(problem, time_budget=1, seed=1)
+        assert result.hard == 0
+        for index, (slot, _room_id) in result.placements.items():
+            if group.id in problem.events[index].groups:
+                assert slot in free
+
+        save_solution(problem, result)
+        pairs = find_conflicting_pairs(Schedule.query.all())
+        assert [kind for kind, _a, _b in pairs if kind == 'group'] == []